@@ -1,26 +1,45 @@
 """
 Flask REST API for Calculator App
 """
-from flask import Flask, request, jsonify
+import math
+from datetime import datetime
+from flask import Flask, request
 from flask_cors import CORS
 import calculator
+import capture
 import database
+import memory
+import preview
+import profiling
+import sampling
+from serialization import respond
 
 app = Flask(__name__)
 # Enable CORS for all routes (allow frontend to communicate)
 CORS(app)
+# Opt-in request profiling (no-op unless CALC_PROFILE_* is configured)
+profiling.init_app(app)
+# Opt-in traffic capture for replay.py (no-op unless CALC_CAPTURE_SAMPLE_RATE is set)
+capture.init_app(app)
+# Opt-in tracemalloc report at /debug/memory (no-op unless CALC_TRACEMALLOC_FRAMES and CALC_PROFILE_SECRET are set)
+memory.init_app(app)
 
-# Initialize database on startup
-database.init_db()
+# History storage backend (see database.create_store) initialized on startup
+store = database.create_store()
+store.init()
 
 @app.route('/')
 def home():
     """Home endpoint"""
-    return jsonify({
+    return respond({
         'message': 'Calculator API',
         'version': '1.0',
         'endpoints': {
             'POST /api/calculate': 'Calculate an expression',
+            'POST /api/calculate/batch': 'Calculate and save several expressions',
+            'POST /api/sample': 'Sample an expression in x over a range for plotting',
+            'POST /api/derivative': 'Evaluate an expression and its gradient at one or more points',
+            'POST /api/preview': 'Preview an expression while typing (not saved)',
             'GET /api/history': 'Get calculation history',
             'DELETE /api/history/<id>': 'Delete specific calculation',
             'DELETE /api/history': 'Clear all history'
@@ -35,9 +54,12 @@ def calculate():
     Request body:
     {
         "expression": "2 + 2",
-        "operation_type": "arithmetic"  (optional)
+        "operation_type": "arithmetic",  (optional)
+        "complex": false                 (optional, allow results like sqrt(-1) = i)
     }
 
+    Matrix results are nested lists, complex results {"re": ..., "im": ...}.
+
     Response:
     {
         "success": true,
@@ -50,7 +72,7 @@ def calculate():
         data = request.get_json()
 
         if not data:
-            return jsonify({
+            return respond({
                 'success': False,
                 'error': 'No data provided'
             }), 400
@@ -58,23 +80,32 @@ def calculate():
         expression = data.get('expression', '').strip()
 
         if not expression:
-            return jsonify({
+            return respond({
                 'success': False,
                 'error': 'Expression is required'
             }), 400
 
+        operation_type = data.get('operation_type')
+        if operation_type and operation_type not in database.OPERATION_TYPES:
+            return respond({
+                'success': False,
+                'error': f'operation_type must be one of {list(database.OPERATION_TYPES)}'
+            }), 400
+
         # Calculate the result
-        result = calculator.evaluate_expression(expression)
+        result = calculator.evaluate_expression(expression, complex_mode=bool(data.get('complex')))
 
         # Determine operation type (or use provided one)
-        operation_type = data.get('operation_type')
         if not operation_type:
-            operation_type = calculator.determine_operation_type(expression)
+            operation_type = calculator.determine_operation_type(expression, result)
 
         # Save to database
-        calculation_id = database.save_calculation(expression, result, operation_type)
+        calculation_id = store.save_calculation(
+            expression, result, operation_type,
+            client=request.headers.get('X-Client-Id')
+        )
 
-        return jsonify({
+        return respond({
             'success': True,
             'expression': expression,
             'result': result,
@@ -82,18 +113,447 @@ def calculate():
             'id': calculation_id
         })
 
+    except (calculator.CalculatorError, database.PartitionLimitError) as e:
+        return respond({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    except Exception as e:
+        return respond({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+# Maximum number of calculations accepted by /api/calculate/batch
+MAX_BATCH_SIZE = 100
+
+# Maximum length of a client_id in /api/calculate/batch
+MAX_CLIENT_ID_LENGTH = 64
+
+def parse_client_timestamp(value):
+    """
+    Parse an ISO 8601 timestamp sent by a client
+
+    Returns:
+        datetime: Naive local time, or None if missing/invalid
+    """
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+@app.route('/api/calculate/batch', methods=['POST'])
+def calculate_batch():
+    """
+    Calculate and save several expressions in one request
+
+    Used by the frontend to sync calculations queued while offline.
+    Each item is evaluated independently; the ones that succeed are
+    saved in a single transaction. Items with a client_id are saved at
+    most once, so a batch can be retried after a lost response: the retry
+    returns the ids of the rows saved the first time.
+
+    Request body:
+    {
+        "calculations": [
+            {
+                "client_id": "c1",
+                "expression": "2 + 2",
+                "operation_type": "arithmetic",   (optional)
+                "complex": false,                 (optional)
+                "timestamp": "2026-01-11T14:30:00Z"  (optional, when it was entered)
+            },
+            ...
+        ]
+    }
+
+    Response:
+    {
+        "success": true,
+        "results": [
+            {
+                "client_id": "c1",
+                "success": true,
+                "id": 7,
+                "expression": "2 + 2",
+                "result": 4.0,
+                "operation_type": "arithmetic",
+                "timestamp": "2026-01-11 14:30:00",
+                "error": null
+            },
+            ...
+        ],
+        "count": 1
+    }
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('calculations'), list):
+            return respond({
+                'success': False,
+                'error': 'calculations list is required'
+            }), 400
+
+        items = data['calculations']
+        if len(items) > MAX_BATCH_SIZE:
+            return respond({
+                'success': False,
+                'error': f'At most {MAX_BATCH_SIZE} calculations per batch'
+            }), 400
+
+        results = []
+        to_save = []
+        for item in items:
+            item = item if isinstance(item, dict) else {}
+            expression = str(item.get('expression') or '').strip()
+            entry = {
+                'client_id': item.get('client_id'),
+                'success': False,
+                'id': None,
+                'expression': expression,
+                'result': None,
+                'operation_type': None,
+                'timestamp': None,
+                'error': None
+            }
+            results.append(entry)
+
+            client_id = item.get('client_id')
+            if client_id is not None and not (
+                    isinstance(client_id, str) and 0 < len(client_id) <= MAX_CLIENT_ID_LENGTH):
+                entry['error'] = f'client_id must be a string of at most {MAX_CLIENT_ID_LENGTH} characters'
+                continue
+
+            operation_type = item.get('operation_type')
+            if operation_type and operation_type not in database.OPERATION_TYPES:
+                entry['error'] = f'operation_type must be one of {list(database.OPERATION_TYPES)}'
+                continue
+
+            try:
+                entry['result'] = calculator.evaluate_expression(
+                    expression, complex_mode=bool(item.get('complex'))
+                )
+            except calculator.CalculatorError as e:
+                entry['error'] = str(e)
+                continue
+
+            entry['operation_type'] = (
+                operation_type
+                or calculator.determine_operation_type(expression, entry['result'])
+            )
+            timestamp = parse_client_timestamp(item.get('timestamp')) or datetime.now()
+            entry['timestamp'] = timestamp.isoformat(' ')
+            entry['success'] = True
+            to_save.append(entry)
+
+        ids = store.save_calculations([
+            (entry['expression'], entry['result'], entry['operation_type'], entry['timestamp'])
+            for entry in to_save
+        ], client=request.headers.get('X-Client-Id'),
+            client_ids=[entry['client_id'] for entry in to_save])
+        for entry, calculation_id in zip(to_save, ids):
+            entry['id'] = calculation_id
+
+        return respond({
+            'success': True,
+            'results': results,
+            'count': len(results)
+        })
+
+    except database.PartitionLimitError as e:
+        return respond({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    except Exception as e:
+        return respond({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/api/preview', methods=['POST'])
+def preview_expression():
+    """
+    Evaluate an expression for live preview without saving it
+
+    Request body:
+    {
+        "expression": "2 + 3 ×",
+        "session_id": "a1b2c3"
+    }
+
+    Response:
+    {
+        "success": true,
+        "expression": "2 + 3 ×",
+        "status": "pending"          ("ok" with "result", or "error" with "error")
+    }
+    """
+    try:
+        data = request.get_json(silent=True)
+
+        if not data:
+            return respond({
+                'success': False,
+                'error': 'No data provided'
+            }), 400
+
+        expression = data.get('expression', '').strip()
+        session_id = str(data.get('session_id') or request.remote_addr)
+
+        response = preview.preview(session_id, expression)
+
+        return respond({
+            'success': True,
+            'expression': expression,
+            **response
+        })
+
+    except Exception as e:
+        return respond({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+# Limits for /api/sample
+MAX_SAMPLE_PIXELS = 4000
+
+@app.route('/api/sample', methods=['POST'])
+def sample_expression():
+    """
+    Sample an expression in one variable over a range for plotting
+
+    The expression is compiled once and sampled adaptively; points where
+    it is undefined become gaps (null). The response has one min/max pair
+    per pixel, whatever the range.
+
+    Request body:
+    {
+        "expression": "sin(x)*exp(-x/50)",
+        "variable": "x",          (optional, default "x")
+        "x_min": 0,
+        "x_max": 720,
+        "pixels": 800
+    }
+
+    Response:
+    {
+        "success": true,
+        "expression": "sin(x)*exp(-x/50)",
+        "x": [0.45, 1.35, ...],
+        "min": [0.0, 0.015, ..., null, ...],
+        "max": [0.007, 0.023, ..., null, ...],
+        "evaluations": 2113
+    }
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return respond({
+                'success': False,
+                'error': 'No data provided'
+            }), 400
+
+        expression = str(data.get('expression', '')).strip()
+        variable = str(data.get('variable') or 'x')
+
+        try:
+            x_min = float(data.get('x_min'))
+            x_max = float(data.get('x_max'))
+            pixels = int(data.get('pixels', 500))
+        except (TypeError, ValueError):
+            return respond({
+                'success': False,
+                'error': 'x_min, x_max and pixels must be numbers'
+            }), 400
+
+        if not variable.isidentifier():
+            return respond({
+                'success': False,
+                'error': 'variable must be a single name such as x'
+            }), 400
+        if not (math.isfinite(x_min) and math.isfinite(x_max) and x_min < x_max):
+            return respond({
+                'success': False,
+                'error': 'x_min must be less than x_max'
+            }), 400
+        if not 2 <= pixels <= MAX_SAMPLE_PIXELS:
+            return respond({
+                'success': False,
+                'error': f'pixels must be between 2 and {MAX_SAMPLE_PIXELS}'
+            }), 400
+
+        func = calculator.compile_expression(expression, (variable,), matrices=False)
+        series = sampling.sample(func, x_min, x_max, pixels, errors=(calculator.CalculatorError,))
+
+        return respond({
+            'success': True,
+            'expression': expression,
+            'variable': variable,
+            'x_min': x_min,
+            'x_max': x_max,
+            'pixels': pixels,
+            **series
+        })
+
     except calculator.CalculatorError as e:
-        return jsonify({
+        return respond({
             'success': False,
             'error': str(e)
         }), 400
 
     except Exception as e:
-        return jsonify({
+        return respond({
             'success': False,
             'error': f'Server error: {str(e)}'
         }), 500
 
+# Maximum number of points accepted by /api/derivative
+MAX_DERIVATIVE_POINTS = 10000
+
+@app.route('/api/derivative', methods=['POST'])
+def derivative():
+    """
+    Evaluate an expression and its exact gradient (forward-mode automatic
+    differentiation) at one point or many
+
+    The expression is compiled once; each point costs one evaluation.
+    Trigonometric functions work in degrees, so d/dx sin(x) = cos(x) * π/180.
+
+    Request body:
+    {
+        "expression": "x**2 * sin(y)",
+        "variables": ["x", "y"],      (optional, default ["x"])
+        "at": [2, 30]                  (one point: a list in variable order,
+                                        an object {"x": 2, "y": 30}, or a
+                                        number for a single variable)
+        or
+        "points": [[2, 30], [3, 45]]   (many points, same formats)
+    }
+
+    Response (at):
+    {
+        "success": true,
+        "expression": "x**2 * sin(y)",
+        "variables": ["x", "y"],
+        "value": 2.0,
+        "gradient": [2.0, 0.0604...]
+    }
+
+    Response (points): "results" holds {"value", "gradient", "error"} per
+    point; points where the expression or its derivative is undefined
+    have value/gradient null and an error message.
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return respond({
+                'success': False,
+                'error': 'No data provided'
+            }), 400
+
+        expression = str(data.get('expression', '')).strip()
+        variables = data.get('variables') or ['x']
+        if isinstance(variables, str):
+            variables = [variables]
+
+        if not isinstance(variables, list) or not all(
+                isinstance(name, str) and name.isidentifier() for name in variables):
+            return respond({
+                'success': False,
+                'error': 'variables must be a list of names such as ["x", "y"]'
+            }), 400
+
+        single = 'at' in data
+        points = [data['at']] if single else data.get('points')
+        if not isinstance(points, list) or not points:
+            return respond({
+                'success': False,
+                'error': 'Provide a point ("at") or a list of points ("points")'
+            }), 400
+        if len(points) > MAX_DERIVATIVE_POINTS:
+            return respond({
+                'success': False,
+                'error': f'At most {MAX_DERIVATIVE_POINTS} points per request'
+            }), 400
+
+        try:
+            points = [parse_point(point, variables) for point in points]
+        except (TypeError, ValueError, KeyError):
+            return respond({
+                'success': False,
+                'error': f'Each point needs a finite number for each of {variables}'
+            }), 400
+
+        gradient = calculator.compile_gradient(expression, tuple(variables))
+
+        if single:
+            value, grad = gradient(*points[0])
+            return respond({
+                'success': True,
+                'expression': expression,
+                'variables': variables,
+                'value': value,
+                'gradient': list(grad)
+            })
+
+        results = []
+        for point in points:
+            try:
+                value, grad = gradient(*point)
+                results.append({'value': value, 'gradient': list(grad), 'error': None})
+            except calculator.CalculatorError as e:
+                results.append({'value': None, 'gradient': None, 'error': str(e)})
+
+        return respond({
+            'success': True,
+            'expression': expression,
+            'variables': variables,
+            'results': results
+        })
+
+    except calculator.CalculatorError as e:
+        return respond({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    except Exception as e:
+        return respond({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+def parse_point(point, variables):
+    """
+    Read one point for /api/derivative as values in variable order
+
+    Raises:
+        ValueError, TypeError, KeyError: If the point is malformed
+    """
+    if isinstance(point, dict):
+        values = [point[name] for name in variables]
+    elif isinstance(point, list):
+        values = point
+    else:
+        values = [point]
+    if len(values) != len(variables) or any(isinstance(value, bool) for value in values):
+        raise ValueError('wrong number of values')
+    values = [float(value) for value in values]
+    if not all(math.isfinite(value) for value in values):
+        raise ValueError('values must be finite')
+    return values
+
 @app.route('/api/history', methods=['GET'])
 def get_history():
     """
@@ -124,16 +584,16 @@ def get_history():
         if limit > 100:
             limit = 100
 
-        calculations = database.get_history(limit)
+        calculations = store.get_history(limit)
 
-        return jsonify({
+        return respond({
             'success': True,
             'calculations': calculations,
             'count': len(calculations)
         })
 
     except Exception as e:
-        return jsonify({
+        return respond({
             'success': False,
             'error': f'Server error: {str(e)}'
         }), 500
@@ -150,21 +610,21 @@ def delete_calculation(calculation_id):
     }
     """
     try:
-        deleted = database.delete_calculation(calculation_id)
+        deleted = store.delete_calculation(calculation_id)
 
         if deleted:
-            return jsonify({
+            return respond({
                 'success': True,
                 'message': 'Calculation deleted'
             })
         else:
-            return jsonify({
+            return respond({
                 'success': False,
                 'error': 'Calculation not found'
             }), 404
 
     except Exception as e:
-        return jsonify({
+        return respond({
             'success': False,
             'error': f'Server error: {str(e)}'
         }), 500
@@ -182,16 +642,16 @@ def clear_history():
     }
     """
     try:
-        count = database.clear_history()
+        count = store.clear_history()
 
-        return jsonify({
+        return respond({
             'success': True,
             'message': 'All history cleared',
             'deleted_count': count
         })
 
     except Exception as e:
-        return jsonify({
+        return respond({
             'success': False,
             'error': f'Server error: {str(e)}'
         }), 500
@@ -199,7 +659,7 @@ def clear_history():
 @app.errorhandler(404)
 def not_found(e):
     """Handle 404 errors"""
-    return jsonify({
+    return respond({
         'success': False,
         'error': 'Endpoint not found'
     }), 404
@@ -207,7 +667,7 @@ def not_found(e):
 @app.errorhandler(500)
 def internal_error(e):
     """Handle 500 errors"""
-    return jsonify({
+    return respond({
         'success': False,
         'error': 'Internal server error'
     }), 500
@@ -219,6 +679,10 @@ if __name__ == '__main__':
     print("Starting Flask server on http://localhost:5000")
     print("\nAvailable endpoints:")
     print("  POST   /api/calculate")
+    print("  POST   /api/calculate/batch")
+    print("  POST   /api/preview")
+    print("  POST   /api/sample")
+    print("  POST   /api/derivative")
     print("  GET    /api/history")
     print("  DELETE /api/history/<id>")
     print("  DELETE /api/history")
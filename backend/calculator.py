@@ -2,8 +2,17 @@
 Calculator engine with arithmetic and scientific operations
 All trigonometric functions work in DEGREES
 """
+import ast
+import cmath
+import functools
 import math
 import re
+from decimal import Decimal, localcontext
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on installed packages
+    np = None
 
 class CalculatorError(Exception):
     """Custom exception for calculator errors"""
@@ -58,40 +67,134 @@ def cbrt(a):
         return -math.pow(-a, 1/3)
     return math.pow(a, 1/3)
 
+# Lookup tables for common inputs
+# Keypad input is dominated by "nice" values (sin(30), 5!, log(100)); these
+# are answered exactly with a single dict lookup, and only table misses go
+# through the math module.
+
+SQRT2_2 = math.sqrt(2) / 2
+SQRT3_2 = math.sqrt(3) / 2
+SQRT3 = math.sqrt(3)
+SQRT3_3 = math.sqrt(3) / 3
+
+def _first_quadrant_sin(d):
+    """sin of an integer angle in [0, 90], exact at the special angles"""
+    special = {0: 0.0, 30: 0.5, 45: SQRT2_2, 60: SQRT3_2, 90: 1.0}
+    if d in special:
+        return special[d]
+    return math.sin(math.radians(d))
+
+def _table_sin(d):
+    """sin of an integer angle, reduced to the first quadrant"""
+    d %= 360
+    if d <= 90:
+        return _first_quadrant_sin(d)
+    if d <= 180:
+        return _first_quadrant_sin(180 - d)
+    if d <= 270:
+        return -_first_quadrant_sin(d - 180)
+    return -_first_quadrant_sin(360 - d)
+
+def _table_tan(d):
+    """tan of an integer angle, None where it is undefined"""
+    special = {0: 0.0, 30: SQRT3_3, 45: 1.0, 60: SQRT3}
+    d %= 180
+    if d == 90:
+        return None
+    if d < 90:
+        return special.get(d, math.tan(math.radians(d)))
+    return -special.get(180 - d, math.tan(math.radians(180 - d)))
+
+# Indexed by the integer angle reduced to one period (None: tan undefined)
+SIN_TABLE = tuple(_table_sin(d) for d in range(360))
+COS_TABLE = tuple(_table_sin(d + 90) for d in range(360))
+TAN_TABLE = tuple(_table_tan(d) for d in range(180))
+
+# Inverse trig at the special values, in degrees
+ASIN_TABLE = {0.0: 0.0, 0.5: 30.0, SQRT2_2: 45.0, SQRT3_2: 60.0, 1.0: 90.0,
+              -0.5: -30.0, -SQRT2_2: -45.0, -SQRT3_2: -60.0, -1.0: -90.0}
+ACOS_TABLE = {value: 90.0 - angle for value, angle in ASIN_TABLE.items()}
+ATAN_TABLE = {0.0: 0.0, SQRT3_3: 30.0, 1.0: 45.0, SQRT3: 60.0,
+              -SQRT3_3: -30.0, -1.0: -45.0, -SQRT3: -60.0}
+
+# n! for every n the calculator accepts (0..170)
+FACTORIAL_TABLE = tuple(math.factorial(n) for n in range(171))
+
+# Gamma at the positive integers and half-integers below its overflow,
+# correctly rounded (math.gamma is off by an ulp at about half of them):
+# gamma(n) = (n-1)! and gamma(n + 1/2) = (2n)! / (4^n n!) * sqrt(pi)
+SQRT_PI_DIGITS = Decimal('1.772453850905516027298167483341145182798')
+
+def _half_integer_gamma(n):
+    with localcontext() as context:
+        context.prec = 40
+        return float(Decimal(math.factorial(2 * n)) / Decimal(4 ** n * math.factorial(n)) * SQRT_PI_DIGITS)
+
+GAMMA_TABLE = {float(n): float(FACTORIAL_TABLE[n - 1]) for n in range(1, 172)}
+GAMMA_TABLE.update({n + 0.5: _half_integer_gamma(n) for n in range(171)})
+
+# Exact powers of ten as typed (float('1e-5') etc.) -> exponent
+LOG10_TABLE = {float(f'1e{k}'): float(k) for k in range(-323, 309)}
+
 # Trigonometric functions (DEGREES mode)
 
+# Fractional angles (a % 1 is non-zero, or NaN for inf/NaN) go straight to
+# the math module; integral ones of any size are reduced to one period,
+# which is exact for floats too, and looked up.
+
 def sin_deg(a):
     """Sine in degrees"""
-    return math.sin(math.radians(a))
+    if a % 1:
+        return math.sin(math.radians(a))
+    return SIN_TABLE[int(a % 360)]
 
 def cos_deg(a):
     """Cosine in degrees"""
-    return math.cos(math.radians(a))
+    if a % 1:
+        return math.cos(math.radians(a))
+    return COS_TABLE[int(a % 360)]
 
 def tan_deg(a):
     """Tangent in degrees"""
-    return math.tan(math.radians(a))
+    if a % 1:
+        return math.tan(math.radians(a))
+    value = TAN_TABLE[int(a % 180)]
+    if value is None:
+        raise CalculatorError("Domain error: tangent is undefined at 90 + 180k degrees")
+    return value
 
 def asin_deg(a):
     """Arcsine in degrees"""
+    value = ASIN_TABLE.get(a)
+    if value is not None:
+        return value
     if a < -1 or a > 1:
         raise CalculatorError("Domain error: arcsin requires input between -1 and 1")
     return math.degrees(math.asin(a))
 
 def acos_deg(a):
     """Arccosine in degrees"""
+    value = ACOS_TABLE.get(a)
+    if value is not None:
+        return value
     if a < -1 or a > 1:
         raise CalculatorError("Domain error: arccos requires input between -1 and 1")
     return math.degrees(math.acos(a))
 
 def atan_deg(a):
     """Arctangent in degrees"""
+    value = ATAN_TABLE.get(a)
+    if value is not None:
+        return value
     return math.degrees(math.atan(a))
 
 # Logarithmic functions
 
 def log10(a):
     """Logarithm base 10"""
+    value = LOG10_TABLE.get(a)
+    if value is not None:
+        return value
     if a <= 0:
         raise CalculatorError("Logarithm requires positive number")
     return math.log10(a)
@@ -121,7 +224,21 @@ def factorial(n):
         raise CalculatorError("Factorial requires integer")
     if n > 170:
         raise CalculatorError("Number too large for factorial")
-    return math.factorial(int(n))
+    return FACTORIAL_TABLE[int(n)]
+
+def gamma(a):
+    """Gamma function, gamma(n) = (n-1)! for positive integers"""
+    # Only integers and half-integers can be in the table
+    if not (a * 2) % 1:
+        value = GAMMA_TABLE.get(a)
+        if value is not None:
+            return value
+    if a <= 0 and a == int(a):
+        raise CalculatorError("Gamma is undefined at zero and negative integers")
+    try:
+        return math.gamma(a)
+    except OverflowError:
+        raise CalculatorError("Result too large")
 
 def absolute(a):
     """Absolute value"""
@@ -139,122 +256,684 @@ def modulo(a, b):
         raise CalculatorError("Modulo by zero")
     return a % b
 
+# Complex numbers
+# Used instead of the real functions when complex mode is on or the
+# expression contains an imaginary literal (2i, 3+4i), so the real path
+# pays nothing for them.
+
+DEG = math.pi / 180
+
+def _complex_version(real_func, complex_func, needs_complex):
+    """Call complex_func for complex input or where real_func is undefined"""
+    def func(a):
+        if isinstance(a, complex) or needs_complex(a):
+            return complex_func(a)
+        return real_func(a)
+    func.__name__ = real_func.__name__
+    func.__doc__ = real_func.__doc__
+    return func
+
+def _nonzero(func, message):
+    """Wrap a complex log so that log(0) still raises"""
+    def wrapped(a):
+        if a == 0:
+            raise CalculatorError(message)
+        return func(a)
+    return wrapped
+
+def _complex_power(a, b):
+    """a^b allowing complex results (e.g. (-8)^(1/3))"""
+    try:
+        return complex(a) ** b
+    except ZeroDivisionError:
+        raise CalculatorError("Division by zero")
+    except OverflowError:
+        raise CalculatorError("Result too large")
+
+def _never(a):
+    """needs_complex for functions defined on all reals: complex input only"""
+    return False
+
+COMPLEX_FUNCTIONS = {
+    'sqrt': _complex_version(sqrt, cmath.sqrt, lambda a: a < 0),
+    'cbrt': _complex_version(cbrt, lambda a: a ** (1 / 3), _never),
+    'sin_deg': _complex_version(sin_deg, lambda a: cmath.sin(a * DEG), _never),
+    'cos_deg': _complex_version(cos_deg, lambda a: cmath.cos(a * DEG), _never),
+    'tan_deg': _complex_version(tan_deg, lambda a: cmath.tan(a * DEG), _never),
+    'asin_deg': _complex_version(asin_deg, lambda a: cmath.asin(a) / DEG, lambda a: a < -1 or a > 1),
+    'acos_deg': _complex_version(acos_deg, lambda a: cmath.acos(a) / DEG, lambda a: a < -1 or a > 1),
+    'atan_deg': _complex_version(atan_deg, lambda a: cmath.atan(a) / DEG, _never),
+    'log10': _complex_version(log10, _nonzero(cmath.log10, "Logarithm requires non-zero number"), lambda a: a < 0),
+    'ln': _complex_version(ln, _nonzero(cmath.log, "Natural logarithm requires non-zero number"), lambda a: a < 0),
+    'exp': _complex_version(exp, cmath.exp, _never),
+}
+
+def _complex_pow(a, b):
+    if isinstance(a, complex) or isinstance(b, complex) or (a < 0 and b != int(b)):
+        return _complex_power(a, b)
+    return power(a, b)
+
+COMPLEX_FUNCTIONS['pow'] = _complex_pow
+
+# Matrix functions (NumPy)
+# Array literals such as [[1, 2], [3, 4]] become NumPy arrays; size limits
+# keep a single request from tying up a worker.
+
+MAX_MATRIX_DIMENSION = 500  # rows/columns per operand, so results stay <= 500x500
+
+def _require_numpy():
+    if np is None:
+        raise CalculatorError("Matrix support requires NumPy (pip install numpy)")
+
+def matrix(value):
+    """
+    Convert an array literal or value to a checked NumPy array
+
+    Raises:
+        CalculatorError: If NumPy is missing, the literal is ragged or
+                         non-numeric, or it exceeds the size limits
+    """
+    _require_numpy()
+    try:
+        array = np.asarray(value)
+    except ValueError:
+        raise CalculatorError("Matrix rows must all have the same length")
+    if array.dtype.kind not in 'biufc':
+        raise CalculatorError("Matrices may only contain numbers")
+    if array.ndim > 2:
+        raise CalculatorError("Only vectors and 2-D matrices are supported")
+    if any(n > MAX_MATRIX_DIMENSION for n in array.shape):
+        raise CalculatorError(f"Matrix too large (max {MAX_MATRIX_DIMENSION} rows/columns)")
+    if array.dtype.kind != 'c':
+        array = array.astype(float)
+    return array
+
+def _square(value):
+    array = matrix(value)
+    if array.ndim != 2 or array.shape[0] != array.shape[1]:
+        raise CalculatorError("Operation requires a square matrix")
+    return array
+
+def det(m):
+    """Determinant of a square matrix"""
+    return np.linalg.det(_square(m))
+
+def inv(m):
+    """Inverse of a square matrix"""
+    try:
+        return np.linalg.inv(_square(m))
+    except np.linalg.LinAlgError:
+        raise CalculatorError("Matrix is singular")
+
+def solve(a, b):
+    """Solve a·x = b for x"""
+    a, b = _square(a), matrix(b)
+    try:
+        return np.linalg.solve(a, b)
+    except np.linalg.LinAlgError:
+        raise CalculatorError("Matrix is singular")
+    except ValueError:
+        raise CalculatorError("Matrix dimensions do not match")
+
+def transpose(m):
+    """Transpose of a matrix"""
+    return matrix(m).T
+
+def trace(m):
+    """Sum of the diagonal of a square matrix"""
+    return np.trace(_square(m))
+
+def dot(a, b):
+    """Matrix/vector product"""
+    try:
+        return np.dot(matrix(a), matrix(b))
+    except ValueError:
+        raise CalculatorError("Matrix dimensions do not match")
+
+def eye(n):
+    """n x n identity matrix"""
+    _require_numpy()
+    if n != int(n) or not 1 <= n <= MAX_MATRIX_DIMENSION:
+        raise CalculatorError(f"Identity size must be an integer between 1 and {MAX_MATRIX_DIMENSION}")
+    return np.eye(int(n))
+
+class _ArrayLiterals(ast.NodeTransformer):
+    """Wrap list literals in matrix() so operators act on arrays, not lists"""
+
+    def visit_List(self, node):
+        self._visit_rows(node)
+        return ast.Call(func=ast.Name(id='matrix', ctx=ast.Load()), args=[node], keywords=[])
+
+    def _visit_rows(self, node):
+        # Nested rows stay plain lists; anything else inside is visited normally
+        node.elts = [
+            self._visit_rows(element) if isinstance(element, ast.List) else self.visit(element)
+            for element in node.elts
+        ]
+        return node
+
+COMPLEX_RESULT_MESSAGE = "Result is a complex number (enable complex mode)"
+
+def _finish_result(result, complex_mode=False):
+    """
+    Validate a raw evaluation result and convert it for the API
+
+    Complex results are rejected unless complex_mode is set: the functions
+    guard their own domains, but operators such as (-1)**0.5 do not.
+
+    Returns:
+        float, complex, or a (nested) list of floats/complex numbers
+    """
+    if np is not None and isinstance(result, np.ndarray):
+        if any(n > MAX_MATRIX_DIMENSION for n in result.shape):
+            raise CalculatorError(f"Matrix too large (max {MAX_MATRIX_DIMENSION} rows/columns)")
+        if not np.isfinite(result).all():
+            raise CalculatorError("Result contains infinity or NaN")
+        if result.ndim == 0:
+            return _finish_result(result.item(), complex_mode)
+        if result.dtype.kind == 'c':
+            if not result.imag.any():
+                return result.real.astype(float).tolist()
+            if not complex_mode:
+                raise CalculatorError(COMPLEX_RESULT_MESSAGE)
+            return result.astype(complex).tolist()
+        return result.astype(float).tolist()
+
+    if isinstance(result, complex):
+        if not cmath.isfinite(result):
+            raise CalculatorError("Result is infinity")
+        if result.imag == 0:
+            return float(result.real)
+        if not complex_mode:
+            raise CalculatorError(COMPLEX_RESULT_MESSAGE)
+        return complex(result)
+
+    # Check for infinity or NaN
+    if math.isinf(result):
+        raise CalculatorError("Result is infinity")
+    if math.isnan(result):
+        raise CalculatorError("Result is not a number")
+
+    return float(result)
+
 # Expression evaluation
 
+# Compiled once; preprocess_expression runs on every request
+PI_TEXT = str(math.pi)
+E_TEXT = str(math.e)
+E_PATTERN = re.compile(r'(?<![A-Za-z_])e(?![A-Za-z_])')
+IMAGINARY_SUFFIX_PATTERN = re.compile(r'(\d)i(?![A-Za-z_0-9])')
+IMAGINARY_UNIT_PATTERN = re.compile(r'(?<![A-Za-z_0-9.])i(?![A-Za-z_0-9])')
+SQUARE_PATTERN = re.compile(r'(\d+)²')
+CUBE_PATTERN = re.compile(r'(\d+)³')
+FACTORIAL_PATTERN = re.compile(r'(\d+)!')
+
+# Function names with Python equivalents (degrees mode); asin/acos/atan
+# become asin_deg/... through the sin/cos/tan rules
+FUNCTION_RENAMES = {
+    'sin': 'sin_deg(',
+    'cos': 'cos_deg(',
+    'tan': 'tan_deg(',
+    'log': 'log10(',
+    'abs': 'absolute(',
+}
+FUNCTION_PATTERN = re.compile(r'(sin|cos|tan|log|abs)\(')
+
+def _rename_function(match):
+    return FUNCTION_RENAMES[match.group(1)]
+
 def preprocess_expression(expression):
     """
     Preprocess the expression to replace special functions and symbols
     with Python-compatible syntax
+
+    Each step returns its input unchanged (no copy) when there is nothing
+    to replace, so typical expressions allocate few intermediate strings.
     """
     expr = expression.strip()
 
     # Replace mathematical symbols
     expr = expr.replace('×', '*')
     expr = expr.replace('÷', '/')
-    expr = expr.replace('π', str(math.pi))
-    expr = expr.replace('e', str(math.e))
-
-    # Replace function names with Python equivalents (degrees mode)
-    replacements = {
-        'sin(': 'sin_deg(',
-        'cos(': 'cos_deg(',
-        'tan(': 'tan_deg(',
-        'asin(': 'asin_deg(',
-        'acos(': 'acos_deg(',
-        'atan(': 'atan_deg(',
-        'log(': 'log10(',
-        'ln(': 'ln(',
-        'sqrt(': 'sqrt(',
-        'cbrt(': 'cbrt(',
-        'abs(': 'absolute(',
-        'exp(': 'exp(',
-    }
-
-    for old, new in replacements.items():
-        expr = expr.replace(old, new)
+    expr = expr.replace('π', PI_TEXT)
+    # Only a standalone 'e' is Euler's number (not the e in exp, det, ...)
+    expr = E_PATTERN.sub(E_TEXT, expr)
+    # Imaginary unit: 3i -> 3j, i -> 1j
+    expr = IMAGINARY_SUFFIX_PATTERN.sub(r'\1j', expr)
+    expr = IMAGINARY_UNIT_PATTERN.sub('1j', expr)
+
+    expr = FUNCTION_PATTERN.sub(_rename_function, expr)
 
     # Handle special patterns
     # x² -> x**2
-    expr = re.sub(r'(\d+)²', r'\1**2', expr)
+    expr = SQUARE_PATTERN.sub(r'\1**2', expr)
     # x³ -> x**3
-    expr = re.sub(r'(\d+)³', r'\1**3', expr)
+    expr = CUBE_PATTERN.sub(r'\1**3', expr)
     # x! -> factorial(x)
-    expr = re.sub(r'(\d+)!', r'factorial(\1)', expr)
+    expr = FACTORIAL_PATTERN.sub(r'factorial(\1)', expr)
 
     return expr
 
-def evaluate_expression(expression):
+# Namespaces an expression is evaluated in. Built once and shared by all
+# evaluations (eval only reads globals; variables go in a per-call locals
+# dict). _compile rejects attribute access and underscore names, so an
+# expression cannot reach them (e.g. via __builtins__ or sin_deg.__globals__).
+SAFE_GLOBALS = {
+    '__builtins__': {},
+    'sin_deg': sin_deg,
+    'cos_deg': cos_deg,
+    'tan_deg': tan_deg,
+    'asin_deg': asin_deg,
+    'acos_deg': acos_deg,
+    'atan_deg': atan_deg,
+    'log10': log10,
+    'ln': ln,
+    'sqrt': sqrt,
+    'cbrt': cbrt,
+    'exp': exp,
+    'factorial': factorial,
+    'gamma': gamma,
+    'absolute': absolute,
+    'abs': absolute,
+    'pow': power,
+    'matrix': matrix,
+    'det': det,
+    'inv': inv,
+    'solve': solve,
+    'transpose': transpose,
+    'trace': trace,
+    'dot': dot,
+    'eye': eye,
+}
+COMPLEX_GLOBALS = {**SAFE_GLOBALS, **COMPLEX_FUNCTIONS}
+
+# Names that cannot be variables: everything in the namespaces, the
+# constants preprocess_expression rewrites (e, i) and the function names
+# a user types before they are renamed (sin -> sin_deg, ...)
+RESERVED_NAMES = frozenset(COMPLEX_GLOBALS).union(
+    ('e', 'i'), FUNCTION_RENAMES, ('asin', 'acos', 'atan')
+)
+
+def _check_variables(variables):
+    for name in variables:
+        if name in RESERVED_NAMES or name.startswith('_'):
+            raise CalculatorError(f"Variable name '{name}' is reserved")
+
+# Syntax an expression may use. Everything else is rejected, notably
+# attributes (sin_deg.__globals__, eye(2).tofile), lambdas and
+# comprehensions: a := inside a comprehension binds in the shared globals,
+# while a top-level := only binds in the per-call locals.
+ALLOWED_NODES = (
+    ast.Expression, ast.Constant, ast.Name, ast.expr_context,
+    ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.operator, ast.unaryop, ast.boolop, ast.cmpop,
+    ast.Call, ast.List, ast.Tuple, ast.Subscript, ast.Slice, ast.NamedExpr,
+)
+
+def _compile(expression):
+    """
+    Preprocess and compile an expression
+
+    Returns:
+        tuple: (code object, True if the expression has imaginary literals).
+               The literals are found in the syntax tree: constant folding
+               also puts results such as (-1)**0.5 into co_consts.
+
+    Raises:
+        CalculatorError: If the expression is empty, not valid syntax, or
+                         uses syntax outside ALLOWED_NODES or names
+                         starting with an underscore (the evaluation
+                         namespaces are shared)
+    """
+    if not expression or expression.strip() == '':
+        raise CalculatorError("Empty expression")
+
+    try:
+        processed_expr = preprocess_expression(expression)
+        tree = ast.parse(processed_expr, mode='eval')
+        imaginary = False
+        for node in ast.walk(tree):
+            if not isinstance(node, ALLOWED_NODES):
+                raise CalculatorError(f"{type(node).__name__} is not allowed in expressions")
+            if isinstance(node, ast.Name):
+                if node.id.startswith('_'):
+                    raise CalculatorError(f"Name '{node.id}' is not allowed")
+            elif isinstance(node, ast.Constant) and isinstance(node.value, complex):
+                imaginary = True
+        if '[' in processed_expr:
+            tree = ast.fix_missing_locations(_ArrayLiterals().visit(tree))
+        return compile(tree, '<expression>', 'eval'), imaginary
+    except SyntaxError:
+        raise CalculatorError("Invalid expression syntax")
+
+def compile_expression(expression, variables=(), complex_mode=False, matrices=True):
+    """
+    Compile an expression once so it can be evaluated many times
+
+    Args:
+        expression (str): Mathematical expression, may use the variables
+        variables (tuple): Variable names, in the order values are passed
+        complex_mode (bool): Allow complex results such as sqrt(-1)
+                             (implied when the expression contains i)
+        matrices (bool): Allow matrix literals and functions. Callers that
+                         evaluate many times per request turn this off: a
+                         single 500x500 inverse takes tens of milliseconds
+
+    Returns:
+        function: f(*values) -> result (see evaluate_expression),
+                  raising CalculatorError on failure
+
+    Raises:
+        CalculatorError: If the expression is empty or not valid syntax,
+                         or uses matrices when they are not allowed
+    """
+    code, imaginary = _compile(expression)
+    if not matrices and _uses_matrices(code):
+        raise CalculatorError("Matrix expressions are not supported here")
+
+    complex_mode = complex_mode or imaginary
+    if complex_mode:
+        namespace = COMPLEX_GLOBALS
+    else:
+        namespace = SAFE_GLOBALS
+    _check_variables(variables)
+
+    def evaluate(*values):
+        try:
+            # Evaluate the expression
+            result = eval(code, namespace, dict(zip(variables, values)))
+
+            return _finish_result(result, complex_mode)
+
+        except CalculatorError:
+            raise
+        except ZeroDivisionError:
+            raise CalculatorError("Division by zero")
+        except NameError as e:
+            raise CalculatorError(f"Unknown function or variable: {str(e)}")
+        except Exception as e:
+            raise CalculatorError(f"Calculation error: {str(e)}")
+
+    return evaluate
+
+# Compiled evaluators are pure functions of their arguments, so they can be
+# shared; live preview re-evaluates the same prefixes over and over, and
+# keypad input repeats the same expressions (parsing and checking the
+# syntax tree costs more than evaluating it)
+COMPILE_CACHE_SIZE = 1024
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_cached(expression, complex_mode=False):
+    """
+    compile_expression() without variables, memoized (least recently used)
+
+    Failures are not cached, so invalid expressions raise every time.
+    """
+    return compile_expression(expression, complex_mode=complex_mode)
+
+def evaluate_expression(expression, complex_mode=False):
     """
     Evaluate a mathematical expression
 
     Args:
         expression (str): Mathematical expression to evaluate
+        complex_mode (bool): Allow complex results such as sqrt(-1)
 
     Returns:
-        float: Result of the evaluation
+        float: Result of the evaluation, or
+        complex: for complex results, or
+        list: (nested) list of numbers for vector/matrix results
 
     Raises:
         CalculatorError: If expression is invalid or calculation fails
     """
-    if not expression or expression.strip() == '':
-        raise CalculatorError("Empty expression")
+    return compile_cached(expression, bool(complex_mode))()
 
-    try:
-        # Preprocess the expression
-        processed_expr = preprocess_expression(expression)
+MATRIX_FUNCTIONS = ('det', 'inv', 'solve', 'transpose', 'trace', 'dot', 'eye')
 
-        # Create a safe namespace with allowed functions
-        safe_namespace = {
-            '__builtins__': {},
-            'sin_deg': sin_deg,
-            'cos_deg': cos_deg,
-            'tan_deg': tan_deg,
-            'asin_deg': asin_deg,
-            'acos_deg': acos_deg,
-            'atan_deg': atan_deg,
-            'log10': log10,
-            'ln': ln,
-            'sqrt': sqrt,
-            'cbrt': cbrt,
-            'exp': exp,
-            'factorial': factorial,
-            'absolute': absolute,
-            'abs': absolute,
-            'pow': power,
-        }
-
-        # Evaluate the expression
-        result = eval(processed_expr, safe_namespace)
-
-        # Check for infinity or NaN
-        if math.isinf(result):
-            raise CalculatorError("Result is infinity")
-        if math.isnan(result):
-            raise CalculatorError("Result is not a number")
+def _uses_matrices(code):
+    """True if compiled code calls a matrix function (array literals call matrix())"""
+    return any(name in MATRIX_FUNCTIONS or name == 'matrix' for name in code.co_names)
 
-        return float(result)
+# Automatic differentiation
+# Forward mode with dual numbers: every variable carries its value and its
+# partial derivatives, so one evaluation gives the value and the gradient.
+# Values still come from the functions above (exact tables, domain checks).
 
-    except CalculatorError:
-        raise
-    except ZeroDivisionError:
-        raise CalculatorError("Division by zero")
-    except SyntaxError:
-        raise CalculatorError("Invalid expression syntax")
-    except NameError as e:
-        raise CalculatorError(f"Unknown function or variable: {str(e)}")
-    except Exception as e:
-        raise CalculatorError(f"Calculation error: {str(e)}")
+class Dual:
+    """A value with its partial derivatives (one per variable)"""
+
+    __slots__ = ('value', 'grad')
+
+    def __init__(self, value, grad):
+        self.value = value
+        self.grad = grad
+
+    def __repr__(self):
+        return f'Dual({self.value!r}, {self.grad!r})'
+
+    def _scaled(self, factor):
+        return tuple(factor * g for g in self.grad)
+
+    def __neg__(self):
+        return Dual(-self.value, self._scaled(-1.0))
+
+    def __pos__(self):
+        return self
+
+    def __add__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value + other.value, tuple(a + b for a, b in zip(self.grad, other.grad)))
+        return Dual(self.value + other, self.grad)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value - other.value, tuple(a - b for a, b in zip(self.grad, other.grad)))
+        return Dual(self.value - other, self.grad)
+
+    def __rsub__(self, other):
+        return Dual(other - self.value, self._scaled(-1.0))
+
+    def __mul__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value * other.value,
+                        tuple(a * other.value + self.value * b for a, b in zip(self.grad, other.grad)))
+        return Dual(self.value * other, self._scaled(other))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Dual):
+            value = divide(self.value, other.value)
+            return Dual(value, tuple((a - value * b) / other.value for a, b in zip(self.grad, other.grad)))
+        return Dual(divide(self.value, other), self._scaled(1 / other))
+
+    def __rtruediv__(self, other):
+        value = divide(other, self.value)
+        return Dual(value, self._scaled(-value / self.value))
+
+    def __mod__(self, other):
+        if isinstance(other, Dual):
+            quotient = math.floor(self.value / other.value)
+            return Dual(modulo(self.value, other.value),
+                        tuple(a - quotient * b for a, b in zip(self.grad, other.grad)))
+        return Dual(modulo(self.value, other), self.grad)
+
+    def __rmod__(self, other):
+        return Dual(other, (0.0,) * len(self.grad)) % self
+
+    def __pow__(self, other):
+        return dual_power(self, other)
+
+    def __rpow__(self, other):
+        return dual_power(other, self)
+
+def dual_power(a, b):
+    """a^b where either side may be a Dual"""
+    if not isinstance(b, Dual):
+        if not isinstance(a, Dual):
+            return power(a, b)
+        # d(u^n) = n u^(n-1) du
+        value = power(a.value, b)
+        slope = 0.0 if b == 0 else b * power(a.value, b - 1)
+        return Dual(value, a._scaled(slope))
+
+    if not isinstance(a, Dual):
+        a = Dual(a, (0.0,) * len(b.grad))
+    # d(u^v) = u^v (v' ln u + v u'/u)
+    value = power(a.value, b.value)
+    if a.value <= 0:
+        if a.value == 0 and not any(b.grad):
+            slope = 0.0 if b.value == 0 else b.value * power(a.value, b.value - 1)
+            return Dual(value, a._scaled(slope))
+        raise CalculatorError("Derivative undefined: variable exponent needs a positive base")
+    log_base = math.log(a.value)
+    return Dual(value, tuple(
+        value * (db * log_base + b.value * da / a.value) for da, db in zip(a.grad, b.grad)
+    ))
+
+def _undefined_at(*points):
+    """Slope check that rejects points where a function is not differentiable"""
+    def check(x):
+        if x in points:
+            raise CalculatorError(f"Derivative undefined at {x:g}")
+    return check
+
+def _differentiable(func, slope, check=None):
+    """
+    Extend a real function to Dual arguments
+
+    Args:
+        func (callable): The real function, used for the value
+        slope (callable): slope(x, value) -> derivative of func at x
+        check (callable): Raises CalculatorError where func has no derivative
+    """
+    def dual_func(x):
+        if not isinstance(x, Dual):
+            return func(x)
+        value = func(x.value)
+        if check:
+            check(x.value)
+        return Dual(value, x._scaled(slope(x.value, value)))
+    dual_func.__name__ = func.__name__
+    dual_func.__doc__ = func.__doc__
+    return dual_func
 
-def determine_operation_type(expression):
+def _constant_only(func, name):
+    """Extend a function without a derivative to Duals that do not vary"""
+    def dual_func(x):
+        if isinstance(x, Dual):
+            if any(x.grad):
+                raise CalculatorError(f"{name} is not differentiable")
+            x = x.value
+        return func(x)
+    return dual_func
+
+LN10 = math.log(10)
+
+# Degree-mode trig: d/dx sin(x°) = cos(x°) * π/180, and the inverse functions
+# return degrees, so their derivatives are divided by π/180
+DUAL_FUNCTIONS = {
+    'sin_deg': _differentiable(sin_deg, lambda x, y: cos_deg(x) * DEG),
+    'cos_deg': _differentiable(cos_deg, lambda x, y: -sin_deg(x) * DEG),
+    'tan_deg': _differentiable(tan_deg, lambda x, y: (1 + y * y) * DEG),
+    'asin_deg': _differentiable(asin_deg, lambda x, y: 1 / (DEG * math.sqrt(1 - x * x)), _undefined_at(-1, 1)),
+    'acos_deg': _differentiable(acos_deg, lambda x, y: -1 / (DEG * math.sqrt(1 - x * x)), _undefined_at(-1, 1)),
+    'atan_deg': _differentiable(atan_deg, lambda x, y: 1 / (DEG * (1 + x * x))),
+    'log10': _differentiable(log10, lambda x, y: 1 / (x * LN10)),
+    'ln': _differentiable(ln, lambda x, y: 1 / x),
+    'sqrt': _differentiable(sqrt, lambda x, y: 0.5 / y, _undefined_at(0)),
+    'cbrt': _differentiable(cbrt, lambda x, y: 1 / (3 * y * y), _undefined_at(0)),
+    'exp': _differentiable(exp, lambda x, y: y),
+    'absolute': _differentiable(absolute, lambda x, y: math.copysign(1.0, x), _undefined_at(0)),
+    'factorial': _constant_only(factorial, "Factorial"),
+    'gamma': _constant_only(gamma, "Gamma"),
+    'pow': dual_power,
+}
+DUAL_FUNCTIONS['abs'] = DUAL_FUNCTIONS['absolute']
+
+DUAL_GLOBALS = {
+    name: func for name, func in SAFE_GLOBALS.items()
+    if name not in MATRIX_FUNCTIONS and name != 'matrix'
+}
+DUAL_GLOBALS.update(DUAL_FUNCTIONS)
+
+def compile_gradient(expression, variables=('x',)):
+    """
+    Compile an expression for evaluation with its gradient
+
+    Args:
+        expression (str): Real scalar expression in the variables
+        variables (tuple): Variable names, in the order values are passed
+
+    Returns:
+        function: f(*values) -> (value, gradient), where gradient is a
+                  tuple of partial derivatives in variable order, raising
+                  CalculatorError where either is undefined
+
+    Raises:
+        CalculatorError: If the expression is invalid, or uses matrices or
+                         complex numbers
+    """
+    code, imaginary = _compile(expression)
+    _check_variables(variables)
+    if _uses_matrices(code):
+        raise CalculatorError("Derivatives of matrix expressions are not supported")
+    if imaginary:
+        raise CalculatorError("Derivatives of complex expressions are not supported")
+
+    namespace = DUAL_GLOBALS
+
+    count = len(variables)
+    seeds = [tuple(1.0 if i == j else 0.0 for j in range(count)) for i in range(count)]
+
+    def gradient(*values):
+        local = {name: Dual(float(value), seed) for name, value, seed in zip(variables, values, seeds)}
+        try:
+            result = eval(code, namespace, local)
+        except CalculatorError:
+            raise
+        except ZeroDivisionError:
+            raise CalculatorError("Division by zero")
+        except NameError as e:
+            raise CalculatorError(f"Unknown function or variable: {str(e)}")
+        except Exception as e:
+            raise CalculatorError(f"Calculation error: {str(e)}")
+
+        if isinstance(result, Dual):
+            value, grad = result.value, result.grad
+        else:
+            value, grad = result, (0.0,) * count
+        value = _finish_result(value)
+        if not all(math.isfinite(g) for g in grad):
+            raise CalculatorError("Derivative is infinite")
+        return value, tuple(float(g) for g in grad)
+
+    return gradient
+
+IMAGINARY_PATTERN = re.compile(r'(?<![A-Za-z_])i(?![A-Za-z_])')
+
+def determine_operation_type(expression, result=None):
     """
-    Determine if expression is arithmetic or scientific
+    Determine the category of an expression
 
     Args:
         expression (str): The mathematical expression
+        result: Its evaluated result, if known (a list means 'matrix',
+                a complex number means 'complex')
 
     Returns:
-        str: 'arithmetic' or 'scientific'
+        str: 'matrix', 'complex', 'scientific' or 'arithmetic'
     """
+    if isinstance(result, list) or '[' in expression:
+        return 'matrix'
+    if re.search(r'\b(' + '|'.join(MATRIX_FUNCTIONS) + r')\s*\(', expression):
+        return 'matrix'
+    if isinstance(result, complex) or IMAGINARY_PATTERN.search(expression):
+        return 'complex'
+
     scientific_keywords = [
         'sin', 'cos', 'tan', 'asin', 'acos', 'atan',
         'log', 'ln', 'sqrt', 'cbrt', 'exp', 'abs',
@@ -268,6 +947,141 @@ def determine_operation_type(expression):
 
     return 'arithmetic'
 
+# Incremental parsing (live preview)
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>\d+\.?\d*|\.\d+)
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<operator>\*\*|[+\-*/×÷%^@])
+  | (?P<lparen>[(\[])
+  | (?P<rparen>[)\]])
+  | (?P<postfix>[!²³])
+  | (?P<constant>π)
+  | (?P<comma>,)
+""", re.VERBOSE)
+
+# Tokens after which the expression cannot be complete
+PENDING_KINDS = ('operator', 'lparen', 'comma')
+
+# Names that are complete values on their own (everything else is a function)
+CONSTANT_NAMES = ('e', 'i')
+
+def tokenize_expression(expression, start=0):
+    """
+    Split an expression into tokens
+
+    Args:
+        expression (str): The expression to tokenize
+        start (int): Offset to start tokenizing from
+
+    Returns:
+        list: (kind, text, offset) tuples, whitespace skipped.
+              Unrecognised characters produce an 'invalid' token.
+    """
+    tokens = []
+    pos = start
+    length = len(expression)
+    while pos < length:
+        match = TOKEN_PATTERN.match(expression, pos)
+        if match is None:
+            tokens.append(('invalid', expression[pos], pos))
+            pos += 1
+            continue
+        kind = match.lastgroup
+        if kind != 'space':
+            tokens.append((kind, match.group(), pos))
+        pos = match.end()
+    return tokens
+
+class IncrementalParser:
+    """
+    Incremental tokenizer/validator for expressions typed key by key
+
+    Keeps the tokens and parenthesis depth of the previous input. When the
+    new input shares a prefix with it, only the text after the last token
+    that is fully inside the shared prefix is re-tokenized (the last token
+    is always redone, since typing can extend it: '1' -> '12', 'si' -> 'sin').
+    Running per-token state (lowest depth, invalid token seen) makes
+    status() constant time.
+    """
+
+    __slots__ = ('expression', 'tokens', 'depths', 'floors', 'broken', 'reused')
+
+    def __init__(self):
+        self.expression = ''
+        self.tokens = []
+        self.depths = []  # parenthesis depth after each token
+        self.floors = []  # lowest depth up to and including each token
+        self.broken = []  # whether an invalid token appears up to each token
+        self.reused = 0   # tokens reused by the last feed()
+
+    def feed(self, expression):
+        """
+        Update the parse state to a new version of the expression
+
+        Args:
+            expression (str): Full current expression
+
+        Returns:
+            str: status() for the new expression
+        """
+        shared = 0
+        limit = min(len(expression), len(self.expression))
+        while shared < limit and expression[shared] == self.expression[shared]:
+            shared += 1
+
+        keep = len(self.tokens)
+        while keep and self.tokens[keep - 1][2] + len(self.tokens[keep - 1][1]) >= shared:
+            keep -= 1
+
+        del self.tokens[keep:]
+        del self.depths[keep:]
+        del self.floors[keep:]
+        del self.broken[keep:]
+        self.reused = keep
+
+        start = self.tokens[-1][2] + len(self.tokens[-1][1]) if self.tokens else 0
+        depth = self.depths[-1] if self.depths else 0
+        floor = self.floors[-1] if self.floors else 0
+        broken = self.broken[-1] if self.broken else False
+        for token in tokenize_expression(expression, start):
+            if token[0] == 'lparen':
+                depth += 1
+            elif token[0] == 'rparen':
+                depth -= 1
+            floor = min(floor, depth)
+            broken = broken or token[0] == 'invalid'
+            self.tokens.append(token)
+            self.depths.append(depth)
+            self.floors.append(floor)
+            self.broken.append(broken)
+
+        self.expression = expression
+        return self.status()
+
+    def status(self):
+        """
+        Classify the current expression
+
+        Returns:
+            str: 'complete' if it can be evaluated, 'pending' if more input
+                 is needed, 'invalid' if no continuation can fix it
+        """
+        if not self.tokens:
+            return 'pending'
+        if self.broken[-1] or self.floors[-1] < 0:
+            return 'invalid'
+
+        kind, text, _ = self.tokens[-1]
+        if self.depths[-1] > 0 or kind in PENDING_KINDS:
+            return 'pending'
+        if kind == 'name' and text not in CONSTANT_NAMES:
+            return 'pending'
+        if kind == 'number' and text.endswith('.'):
+            return 'pending'
+        return 'complete'
+
 # Testing
 if __name__ == '__main__':
     # Test cases
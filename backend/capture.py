@@ -0,0 +1,161 @@
+"""
+Traffic capture for the Calculator API
+
+Records a sample of requests (timing, endpoint, payload and the original
+response) to a rotating JSON Lines log that backend/replay.py can replay
+against another build. Capture is opt-in and configured through
+environment variables:
+
+- CALC_CAPTURE_SAMPLE_RATE  Fraction of requests captured (0.0 - 1.0)
+- CALC_CAPTURE_DIR          Output directory (default: backend/captures)
+- CALC_CAPTURE_MAX_BYTES    Size at which the log rotates (default: 10 MB)
+- CALC_CAPTURE_BACKUPS      Number of rotated logs kept (default: 5)
+
+When the sample rate is 0, init_app() installs nothing, so there is no
+per-request overhead. Requests with a body of unknown length (chunked
+uploads, no Content-Length) are passed through without being captured.
+
+Each line is one request with short keys to keep the log compact:
+    {"t": start time (unix seconds), "m": method, "p": path, "q": query,
+     "h": selected headers, "b": request body, "s": status code,
+     "r": response body (null if binary or too large), "ms": duration}
+"""
+import io
+import json
+import logging
+import logging.handlers
+import os
+import random
+import time
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), 'captures')
+LOG_NAME = 'traffic.jsonl'
+MAX_BODY_BYTES = 64 * 1024   # larger bodies are not captured
+HEADERS = ('Content-Type', 'Accept', 'X-Client-Id')
+SKIP_PREFIXES = ('/admin/',)
+
+
+def load_config():
+    """Read the capture configuration from the environment"""
+    return {
+        'sample_rate': float(os.environ.get('CALC_CAPTURE_SAMPLE_RATE', '0')),
+        'directory': os.environ.get('CALC_CAPTURE_DIR', DEFAULT_DIR),
+        'max_bytes': int(os.environ.get('CALC_CAPTURE_MAX_BYTES', str(10 * 1024 * 1024))),
+        'backups': int(os.environ.get('CALC_CAPTURE_BACKUPS', '5')),
+    }
+
+
+def _decode(body):
+    """Body as text for the log, or None if it is binary or too large"""
+    if body is None or len(body) > MAX_BODY_BYTES:
+        return None
+    try:
+        return body.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+
+
+class CaptureMiddleware:
+    """WSGI middleware that logs a sample of requests and their responses"""
+
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.config = config
+        os.makedirs(config['directory'], exist_ok=True)
+
+        # RotatingFileHandler does the locking and rotation for us
+        self.handler = logging.handlers.RotatingFileHandler(
+            os.path.join(config['directory'], LOG_NAME),
+            maxBytes=config['max_bytes'],
+            backupCount=config['backups'],
+            encoding='utf-8'
+        )
+        self.handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger = logging.getLogger(f'calculator.capture.{id(self)}')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(self.handler)
+
+    def should_capture(self, environ):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(SKIP_PREFIXES) or environ.get('REQUEST_METHOD') == 'OPTIONS':
+            return False
+        if environ.get('HTTP_TRANSFER_ENCODING'):
+            # Body length unknown up front; reading it here could consume
+            # an unbounded stream, so leave the request alone
+            return False
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return False
+        return length <= MAX_BODY_BYTES and random.random() < self.config['sample_rate']
+
+    def __call__(self, environ, start_response):
+        if not self.should_capture(environ):
+            return self.wsgi_app(environ, start_response)
+
+        started_at = time.time()
+        started = time.perf_counter()
+
+        # Read the body once and hand the app a fresh stream
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        request_body = b''
+        if length:
+            request_body = environ['wsgi.input'].read(length)
+            environ['wsgi.input'] = io.BytesIO(request_body)
+
+        status = []
+
+        def capture_start_response(status_line, headers, exc_info=None):
+            status.append(status_line)
+            return start_response(status_line, headers, exc_info)
+
+        response = self.wsgi_app(environ, capture_start_response)
+        try:
+            body = b''.join(response)
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+
+        record = {
+            't': round(started_at, 6),
+            'm': environ.get('REQUEST_METHOD', 'GET'),
+            'p': environ.get('PATH_INFO', ''),
+            'q': environ.get('QUERY_STRING', ''),
+            'h': {
+                name: environ[_environ_key(name)] for name in HEADERS
+                if _environ_key(name) in environ
+            },
+            'b': _decode(request_body),
+            's': int(status[0].split(' ', 1)[0]) if status else 0,
+            'r': _decode(body),
+            'ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+        self.logger.info(json.dumps(record, separators=(',', ':'), ensure_ascii=False))
+        return [body]
+
+
+def _environ_key(header):
+    """WSGI environ key for a request header"""
+    if header == 'Content-Type':
+        return 'CONTENT_TYPE'
+    return 'HTTP_' + header.upper().replace('-', '_')
+
+
+def init_app(app, config=None):
+    """
+    Install traffic capture on a Flask app if it is enabled
+
+    Args:
+        app (Flask): The application
+        config (dict): Overrides load_config() (mainly for tests)
+
+    Returns:
+        bool: True if capture was installed
+    """
+    config = config or load_config()
+    if config['sample_rate'] <= 0:
+        return False
+
+    app.wsgi_app = CaptureMiddleware(app.wsgi_app, config)
+    return True
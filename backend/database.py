@@ -1,35 +1,677 @@
 """
-Database operations for calculator app using SQLite
+Database operations for calculator app
+
+History storage is pluggable. Every backend implements the HistoryStore
+interface:
+
+- SQLiteStore             Single SQLite file (the original storage)
+- MemoryRingStore         In-memory ring buffer keeping the latest N
+- PartitionedSQLiteStore  One SQLite file per time period or client
+
+create_store() picks one from the CALC_STORAGE* environment variables.
+The module-level functions (init_db, save_calculation, ...) keep working
+against the SQLite file at DB_PATH.
 """
+import heapq
+import itertools
+import os
+import re
 import sqlite3
+import struct
+import sys
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict, deque, namedtuple
 from datetime import datetime
-import os
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'calculator.db')
+PARTITION_DIR = os.path.join(os.path.dirname(__file__), 'partitions')
+
+OPERATION_TYPES = ('arithmetic', 'scientific', 'matrix', 'complex')
+
+# Real scalar results are stored in `result`; complex and vector/matrix
+# results are packed into `result_data` (see encode_result). client_id is
+# the optional id a client gave a calculation, so retried saves are not
+# stored twice.
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS calculations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        expression TEXT NOT NULL,
+        result REAL,
+        result_data BLOB,
+        operation_type TEXT CHECK(operation_type IN ('arithmetic', 'scientific', 'matrix', 'complex')),
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        client_id TEXT
+    )
+'''
+
+CLIENT_ID_INDEX = '''
+    CREATE UNIQUE INDEX IF NOT EXISTS calculations_client_id ON calculations (client_id)
+'''
+
+TIMESTAMP_INDEX = '''
+    CREATE INDEX IF NOT EXISTS calculations_timestamp ON calculations (timestamp)
+'''
+
+# Tables created before result_data existed are rebuilt by SQLiteStore.init
+MIGRATE_V1 = '''
+    BEGIN;
+    ALTER TABLE calculations RENAME TO calculations_v1;
+    {schema};
+    INSERT INTO calculations (id, expression, result, operation_type, timestamp)
+        SELECT id, expression, result, operation_type, timestamp FROM calculations_v1;
+    DELETE FROM sqlite_sequence WHERE name = 'calculations';
+    UPDATE sqlite_sequence SET name = 'calculations' WHERE name = 'calculations_v1';
+    DROP TABLE calculations_v1;
+    COMMIT;
+'''.format(schema=SCHEMA)
+
+# Tables created before client_id existed
+MIGRATE_V2 = 'ALTER TABLE calculations ADD COLUMN client_id TEXT'
+
+# result_data layout: kind (0 real, 1 complex), ndim, ndim x uint32 shape,
+# then little-endian doubles (complex values as re, im pairs)
+RESULT_HEADER = struct.Struct('<BB')
+RESULT_DIM = struct.Struct('<I')
+
+# Compact history record: a tuple without a per-instance __dict__.
+# MemoryRingStore keeps these and builds dicts only when history is read.
+Calculation = namedtuple('Calculation', 'id expression result operation_type timestamp')
+
+def dict_factory(cursor, row):
+    """Build each row straight into a dict (no sqlite3.Row -> dict copy)"""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+def encode_result(result):
+    """
+    Split a result into its column values
+
+    Args:
+        result: float, complex, or (nested) list of numbers
+
+    Returns:
+        tuple: (result, result_data) - a float and None for real scalars,
+               None and packed bytes for everything else
+    """
+    if isinstance(result, (int, float)):
+        return float(result), None
+
+    if isinstance(result, complex):
+        shape, flat = (), [result]
+    elif result and isinstance(result[0], list):
+        shape = (len(result), len(result[0]))
+        flat = [value for row in result for value in row]
+    else:
+        shape, flat = (len(result),), result
+
+    is_complex = any(isinstance(value, complex) for value in flat)
+    values = array('d')
+    for value in flat:
+        if is_complex:
+            value = complex(value)
+            values.append(value.real)
+            values.append(value.imag)
+        else:
+            values.append(value)
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+    header = RESULT_HEADER.pack(int(is_complex), len(shape))
+    dims = b''.join(RESULT_DIM.pack(n) for n in shape)
+    return None, header + dims + values.tobytes()
+
+def decode_result(data):
+    """Inverse of encode_result for the result_data column"""
+    is_complex, ndim = RESULT_HEADER.unpack_from(data)
+    offset = RESULT_HEADER.size
+    shape = []
+    for _ in range(ndim):
+        shape.append(RESULT_DIM.unpack_from(data, offset)[0])
+        offset += RESULT_DIM.size
+
+    values = array('d')
+    values.frombytes(data[offset:])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    flat = list(values)
+    if is_complex:
+        flat = [complex(re_, im) for re_, im in zip(flat[::2], flat[1::2])]
 
-def get_connection():
+    if ndim == 0:
+        return flat[0]
+    if ndim == 1:
+        return flat
+    rows, cols = shape
+    return [flat[i * cols:(i + 1) * cols] for i in range(rows)]
+
+def get_connection(path=None):
     """Create and return a database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    conn = sqlite3.connect(path or DB_PATH)
+    conn.row_factory = dict_factory  # Return rows as dictionaries
     return conn
 
-def init_db():
-    """Initialize the database and create tables if they don't exist"""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS calculations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            expression TEXT NOT NULL,
-            result REAL NOT NULL,
-            operation_type TEXT CHECK(operation_type IN ('arithmetic', 'scientific')),
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+# Storage interface
+
+class HistoryStore(ABC):
+    """
+    Interface for calculation history storage
+
+    Records are dictionaries with id, expression, result, operation_type
+    and timestamp. IDs are positive integers, unique within a store.
+    """
+
+    def init(self):
+        """Prepare the storage (create tables, directories, ...)"""
+
+    def save_calculation(self, expression, result, operation_type='arithmetic',
+                         timestamp=None, client=None):
+        """
+        Save a calculation
+
+        Args:
+            expression (str): The mathematical expression
+            result: The calculated result (float, complex or list)
+            operation_type (str): 'arithmetic', 'scientific', 'matrix' or 'complex'
+            timestamp (datetime|str): When it was entered (default: now)
+            client (str): Client/tenant identifier, used for partitioning
+
+        Returns:
+            int: The ID of the saved record
+        """
+        return self.save_calculations([(expression, result, operation_type, timestamp)], client)[0]
+
+    @abstractmethod
+    def save_calculations(self, calculations, client=None, client_ids=None):
+        """
+        Save several calculations
+
+        Args:
+            calculations (list): (expression, result, operation_type, timestamp)
+                                 tuples; timestamp may be None for "now"
+            client (str): Client/tenant identifier, used for partitioning
+            client_ids (list): Optional client-side id per calculation (or
+                               None). A calculation whose client id was
+                               already saved is not stored again; its
+                               existing ID is returned instead.
+
+        Returns:
+            list: The IDs of the saved records, in input order
+        """
+
+    @abstractmethod
+    def get_history(self, limit=10):
+        """
+        Get the latest calculations
+
+        Args:
+            limit (int): Number of records to retrieve (default: 10)
+
+        Returns:
+            list: Calculation dictionaries, newest first
+        """
+
+    @abstractmethod
+    def delete_calculation(self, calculation_id):
+        """
+        Delete a specific calculation by ID
+
+        Returns:
+            bool: True if deleted, False if not found
+        """
+
+    @abstractmethod
+    def clear_history(self):
+        """
+        Delete all calculations
+
+        Returns:
+            int: Number of records deleted
+        """
+
+class SQLiteStore(HistoryStore):
+    """History in a single SQLite file"""
+
+    def __init__(self, path=None):
+        self.path = path or DB_PATH
+
+    def init(self):
+        conn = get_connection(self.path)
+        try:
+            conn.execute(SCHEMA)
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(calculations)')]
+            if 'result_data' not in columns:
+                conn.executescript(MIGRATE_V1)
+            elif 'client_id' not in columns:
+                conn.execute(MIGRATE_V2)
+            conn.execute(CLIENT_ID_INDEX)
+            conn.execute(TIMESTAMP_INDEX)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def save_calculations(self, calculations, client=None, client_ids=None):
+        conn = get_connection(self.path)
+        try:
+            cursor = conn.cursor()
+
+            ids = []
+            now = datetime.now()
+            for (expression, result, operation_type, timestamp), client_id in zip(
+                    calculations, client_ids or itertools.repeat(None)):
+                result, result_data = encode_result(result)
+                cursor.execute('''
+                    INSERT INTO calculations
+                        (expression, result, result_data, operation_type, timestamp, client_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (client_id) DO NOTHING
+                ''', (expression, result, result_data, operation_type, timestamp or now, client_id))
+                if cursor.rowcount:
+                    ids.append(cursor.lastrowid)
+                else:
+                    # Already saved by an earlier (retried) request
+                    cursor.execute('SELECT id FROM calculations WHERE client_id = ?', (client_id,))
+                    ids.append(cursor.fetchone()['id'])
+
+            conn.commit()
+        finally:
+            # Closing without commit rolls back, so a failed batch saves nothing
+            conn.close()
+
+        return ids
+
+    def get_history(self, limit=10):
+        return self._select_history(limit, 'id DESC')
+
+    def _select_history(self, limit, order):
+        """Latest `limit` records in the given ORDER BY (a fixed clause, not user input)"""
+        conn = get_connection(self.path)
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # plain tuples; each row becomes one dict below
+
+            cursor.execute(f'''
+                SELECT id, expression, result, operation_type, timestamp, result_data
+                FROM calculations
+                ORDER BY {order}
+                LIMIT ?
+            ''', (limit,))
+
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {
+                'id': calculation_id,
+                'expression': expression,
+                'result': result if result_data is None else decode_result(result_data),
+                'operation_type': operation_type,
+                'timestamp': timestamp
+            }
+            for calculation_id, expression, result, operation_type, timestamp, result_data in rows
+        ]
+
+    def delete_calculation(self, calculation_id):
+        conn = get_connection(self.path)
+        try:
+            cursor = conn.cursor()
+
+            cursor.execute('DELETE FROM calculations WHERE id = ?', (calculation_id,))
+            rows_affected = cursor.rowcount
+
+            conn.commit()
+        finally:
+            conn.close()
+
+        return rows_affected > 0
+
+    def clear_history(self):
+        conn = get_connection(self.path)
+        try:
+            cursor = conn.cursor()
+
+            cursor.execute('SELECT COUNT(*) as count FROM calculations')
+            count = cursor.fetchone()['count']
+
+            cursor.execute('DELETE FROM calculations')
+
+            conn.commit()
+        finally:
+            conn.close()
+
+        return count
+
+class MemoryRingStore(HistoryStore):
+    """
+    In-memory ring buffer keeping only the latest `capacity` calculations
+
+    Reads rely on deque operations being atomic under the GIL (copy,
+    remove), so they take no lock; saves lock only to check client ids.
+    Records are kept as Calculation tuples. Client ids of the latest
+    `capacity` saves are remembered for deduplication. History is lost on
+    restart.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._records = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._client_ids = OrderedDict()  # client id -> calculation id
+        self._lock = threading.Lock()
+
+    def save_calculations(self, calculations, client=None, client_ids=None):
+        ids = []
+        with self._lock:
+            for (expression, result, operation_type, timestamp), client_id in zip(
+                    calculations, client_ids or itertools.repeat(None)):
+                if client_id is not None and client_id in self._client_ids:
+                    ids.append(self._client_ids[client_id])
+                    continue
+
+                calculation_id = next(self._ids)
+                self._records.append(Calculation(
+                    calculation_id, expression, result, operation_type,
+                    str(timestamp or datetime.now())
+                ))
+                if client_id is not None:
+                    self._client_ids[client_id] = calculation_id
+                    if len(self._client_ids) > self.capacity:
+                        self._client_ids.popitem(last=False)
+                ids.append(calculation_id)
+        return ids
+
+    def get_history(self, limit=10):
+        return [
+            {
+                'id': calculation_id,
+                'expression': expression,
+                'result': result,
+                'operation_type': operation_type,
+                'timestamp': timestamp
+            }
+            for calculation_id, expression, result, operation_type, timestamp
+            in itertools.islice(reversed(self._records.copy()), limit)
+        ]
+
+    def delete_calculation(self, calculation_id):
+        for record in self._records.copy():
+            if record.id == calculation_id:
+                try:
+                    self._records.remove(record)
+                except ValueError:
+                    return False  # evicted or deleted concurrently
+                return True
+        return False
+
+    def clear_history(self):
+        count = len(self._records)
+        self._records.clear()
+        return count
+
+class PartitionLimitError(ValueError):
+    """A calculation would need a new partition beyond max_partitions"""
+
+class PartitionedSQLiteStore(HistoryStore):
+    """
+    History sharded across SQLite files by time period or client
+
+    Each partition is its own file under `directory`, so writes to
+    different partitions don't contend and an old partition can be
+    dropped by deleting its file. A small manifest database numbers the
+    partitions and records the latest timestamp saved to each, so reads
+    only open the partitions that can hold the newest records. Record IDs
+    encode both parts: partition_number * PARTITION_ID_SPAN + rowid.
+
+    Partition keys come from request data (client timestamps, the
+    X-Client-Id header), so at most `max_partitions` are created.
+    """
+
+    PARTITION_ID_SPAN = 2 ** 32
+    PERIOD_FORMATS = {'month': '%Y-%m', 'day': '%Y-%m-%d'}
+
+    def __init__(self, directory=None, partition_by='month', max_partitions=1000):
+        if partition_by not in self.PERIOD_FORMATS and partition_by != 'client':
+            raise ValueError("partition_by must be 'month', 'day' or 'client'")
+        self.directory = directory or PARTITION_DIR
+        self.partition_by = partition_by
+        self.max_partitions = max_partitions
+        self.manifest_path = os.path.join(self.directory, 'partitions.db')
+        self._lock = threading.Lock()
+        self._known = {}  # partition key -> number
+
+    def init(self):
+        os.makedirs(self.directory, exist_ok=True)
+        conn = get_connection(self.manifest_path)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS partitions (
+                    number INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL UNIQUE,
+                    latest TEXT
+                )
+            ''')
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(partitions)')]
+            if 'latest' not in columns:
+                # Manifests from before `latest`: read it from each partition once
+                conn.execute('ALTER TABLE partitions ADD COLUMN latest TEXT')
+                for row in conn.execute('SELECT key FROM partitions').fetchall():
+                    conn.execute('UPDATE partitions SET latest = ? WHERE key = ?',
+                                 (self._read_latest(row['key']), row['key']))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _read_latest(self, key):
+        if not os.path.exists(self._path(key)):
+            return None
+        partition = get_connection(self._path(key))
+        try:
+            return partition.execute('SELECT MAX(timestamp) AS latest FROM calculations').fetchone()['latest']
+        except sqlite3.OperationalError:
+            return None  # created but never initialized
+        finally:
+            partition.close()
+
+    def partition_key(self, timestamp=None, client=None):
+        """Name of the partition a calculation belongs to"""
+        if self.partition_by == 'client':
+            return re.sub(r'[^A-Za-z0-9_-]', '_', client or '')[:64] or 'default'
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        return (timestamp or datetime.now()).strftime(self.PERIOD_FORMATS[self.partition_by])
+
+    def partitions(self):
+        """
+        List partitions
+
+        Returns:
+            list: (number, key) tuples, oldest partition first
+        """
+        conn = get_connection(self.manifest_path)
+        try:
+            rows = conn.execute('SELECT number, key FROM partitions ORDER BY number').fetchall()
+        finally:
+            conn.close()
+        return [(row['number'], row['key']) for row in rows]
+
+    def _nonempty_partitions(self):
+        """(number, key, latest) of partitions saved to since their last clear, newest first"""
+        conn = get_connection(self.manifest_path)
+        try:
+            rows = conn.execute('''
+                SELECT number, key, latest FROM partitions
+                WHERE latest IS NOT NULL
+                ORDER BY latest DESC, number DESC
+            ''').fetchall()
+        finally:
+            conn.close()
+        return [(row['number'], row['key'], row['latest']) for row in rows]
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'calculations-{key}.db')
+
+    def _number(self, key):
+        """Partition number for a key, creating the partition if needed"""
+        number = self._known.get(key)
+        if number is not None:
+            return number
+
+        with self._lock:
+            conn = get_connection(self.manifest_path)
+            try:
+                row = conn.execute('SELECT number FROM partitions WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    count = conn.execute('SELECT COUNT(*) AS count FROM partitions').fetchone()['count']
+                    if count >= self.max_partitions:
+                        raise PartitionLimitError(
+                            f"Partition limit reached ({self.max_partitions}), cannot add '{key}'"
+                        )
+                    conn.execute('INSERT OR IGNORE INTO partitions (key) VALUES (?)', (key,))
+                    conn.commit()
+                    row = conn.execute('SELECT number FROM partitions WHERE key = ?', (key,)).fetchone()
+                number = row['number']
+            finally:
+                conn.close()
+
+            SQLiteStore(self._path(key)).init()
+            self._known[key] = number
+        return number
+
+    def _split_id(self, calculation_id):
+        return divmod(calculation_id, self.PARTITION_ID_SPAN)
+
+    def save_calculations(self, calculations, client=None, client_ids=None):
+        # Client ids are unique per partition; a retry carries the same
+        # timestamp and client, so it lands in the same partition
+        now = datetime.now()
+        groups = {}
+        for index, ((expression, result, operation_type, timestamp), client_id) in enumerate(
+                zip(calculations, client_ids or itertools.repeat(None))):
+            key = self.partition_key(timestamp or now, client)
+            groups.setdefault(key, []).append(
+                (index, (expression, result, operation_type, timestamp or now), client_id)
+            )
+
+        ids = [None] * len(calculations)
+        for key, items in groups.items():
+            number = self._number(key)
+            rowids = SQLiteStore(self._path(key)).save_calculations(
+                [item for _, item, _ in items],
+                client_ids=[client_id for _, _, client_id in items]
+            )
+            for (index, _, _), rowid in zip(items, rowids):
+                ids[index] = number * self.PARTITION_ID_SPAN + rowid
+            self._update_latest(number, max(str(item[3]) for _, item, _ in items))
+        return ids
+
+    def _update_latest(self, number, timestamp):
+        conn = get_connection(self.manifest_path)
+        try:
+            conn.execute(
+                'UPDATE partitions SET latest = max(coalesce(latest, \'\'), ?) WHERE number = ?',
+                (timestamp, number)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_history(self, limit=10):
+        # Partitions are read newest first and merged on (timestamp, id),
+        # the order each one is queried in; once `limit` records are newer
+        # than everything left in the next partition, the rest are skipped
+        def order(row):
+            return (str(row['timestamp']), row['id'])
+
+        history = []
+        for number, key, latest in self._nonempty_partitions():
+            if len(history) >= limit and str(history[-1]['timestamp']) > latest:
+                break
+            rows = SQLiteStore(self._path(key))._select_history(limit, 'timestamp DESC, id DESC')
+            for row in rows:
+                row['id'] += number * self.PARTITION_ID_SPAN
+            history = list(itertools.islice(heapq.merge(history, rows, key=order, reverse=True), limit))
+        return history
+
+    def delete_calculation(self, calculation_id):
+        number, rowid = self._split_id(calculation_id)
+        for partition_number, key in self.partitions():
+            if partition_number == number:
+                return SQLiteStore(self._path(key)).delete_calculation(rowid)
+        return False
+
+    def clear_history(self):
+        count = 0
+        for number, key, _ in self._nonempty_partitions():
+            # Marked empty first: a save racing with the clear sets it again
+            self._mark_empty(number)
+            count += SQLiteStore(self._path(key)).clear_history()
+        return count
+
+    def _mark_empty(self, number):
+        conn = get_connection(self.manifest_path)
+        try:
+            conn.execute('UPDATE partitions SET latest = NULL WHERE number = ?', (number,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def drop_partition(self, key):
+        """
+        Delete a whole partition (e.g. an old month) at once
+
+        Returns:
+            bool: True if the partition existed
+        """
+        with self._lock:
+            conn = get_connection(self.manifest_path)
+            try:
+                cursor = conn.execute('DELETE FROM partitions WHERE key = ?', (key,))
+                existed = cursor.rowcount > 0
+                conn.commit()
+            finally:
+                conn.close()
+            self._known.pop(key, None)
+
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+        return existed
+
+def create_store(config=None):
+    """
+    Create the history store selected by configuration
+
+    Configuration keys (read from the environment when config is None):
+        CALC_STORAGE          'sqlite' (default), 'memory' or 'partitioned'
+        CALC_DB_PATH          SQLite file for 'sqlite' (default: DB_PATH)
+        CALC_MEMORY_CAPACITY  Records kept by 'memory' (default: 100)
+        CALC_PARTITION_DIR    Directory for 'partitioned' (default: PARTITION_DIR)
+        CALC_PARTITION_BY     'month' (default), 'day' or 'client'
+        CALC_MAX_PARTITIONS   Partitions 'partitioned' creates at most (default: 1000)
+
+    Returns:
+        HistoryStore: The configured (not yet initialized) store
+    """
+    config = os.environ if config is None else config
+    backend = config.get('CALC_STORAGE', 'sqlite')
+
+    if backend == 'sqlite':
+        return SQLiteStore(config.get('CALC_DB_PATH'))
+    if backend == 'memory':
+        return MemoryRingStore(int(config.get('CALC_MEMORY_CAPACITY', 100)))
+    if backend == 'partitioned':
+        return PartitionedSQLiteStore(
+            config.get('CALC_PARTITION_DIR'),
+            config.get('CALC_PARTITION_BY', 'month'),
+            int(config.get('CALC_MAX_PARTITIONS', 1000))
         )
-    ''')
+    raise ValueError(f"Unknown storage backend: {backend}")
 
-    conn.commit()
-    conn.close()
+# Module-level API for the default SQLite file
+
+def init_db():
+    """Initialize the database and create tables if they don't exist"""
+    SQLiteStore(DB_PATH).init()
     print("Database initialized successfully")
 
 def save_calculation(expression, result, operation_type='arithmetic'):
@@ -44,19 +686,20 @@ def save_calculation(expression, result, operation_type='arithmetic'):
     Returns:
         int: The ID of the inserted record
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    return SQLiteStore(DB_PATH).save_calculation(expression, result, operation_type)
 
-    cursor.execute('''
-        INSERT INTO calculations (expression, result, operation_type, timestamp)
-        VALUES (?, ?, ?, ?)
-    ''', (expression, result, operation_type, datetime.now()))
+def save_calculations(calculations):
+    """
+    Save several calculations in a single transaction
 
-    calculation_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    Args:
+        calculations (list): (expression, result, operation_type, timestamp)
+                             tuples; timestamp may be None for "now"
 
-    return calculation_id
+    Returns:
+        list: The IDs of the inserted records, in input order
+    """
+    return SQLiteStore(DB_PATH).save_calculations(calculations)
 
 def get_history(limit=10):
     """
@@ -68,31 +711,7 @@ def get_history(limit=10):
     Returns:
         list: List of calculation dictionaries
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        SELECT id, expression, result, operation_type, timestamp
-        FROM calculations
-        ORDER BY id DESC
-        LIMIT ?
-    ''', (limit,))
-
-    rows = cursor.fetchall()
-    conn.close()
-
-    # Convert rows to dictionaries
-    calculations = []
-    for row in rows:
-        calculations.append({
-            'id': row['id'],
-            'expression': row['expression'],
-            'result': row['result'],
-            'operation_type': row['operation_type'],
-            'timestamp': row['timestamp']
-        })
-
-    return calculations
+    return SQLiteStore(DB_PATH).get_history(limit)
 
 def delete_calculation(calculation_id):
     """
@@ -104,16 +723,7 @@ def delete_calculation(calculation_id):
     Returns:
         bool: True if deleted, False if not found
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('DELETE FROM calculations WHERE id = ?', (calculation_id,))
-    rows_affected = cursor.rowcount
-
-    conn.commit()
-    conn.close()
-
-    return rows_affected > 0
+    return SQLiteStore(DB_PATH).delete_calculation(calculation_id)
 
 def clear_history():
     """
@@ -122,18 +732,7 @@ def clear_history():
     Returns:
         int: Number of records deleted
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('SELECT COUNT(*) as count FROM calculations')
-    count = cursor.fetchone()['count']
-
-    cursor.execute('DELETE FROM calculations')
-
-    conn.commit()
-    conn.close()
-
-    return count
+    return SQLiteStore(DB_PATH).clear_history()
 
 # Initialize database when module is imported
 if __name__ == '__main__':
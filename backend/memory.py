@@ -0,0 +1,183 @@
+"""
+Memory reporting for long-running Calculator API workers
+
+Opt-in and configured through environment variables:
+
+- CALC_TRACEMALLOC_FRAMES  Enables tracemalloc with this many frames per
+                           allocation traceback (default: 0 = off). 1 is
+                           enough for per-line reports; tracing costs
+                           memory and CPU in proportion to this number.
+
+When enabled, GET /debug/memory reports the traced and resident memory,
+the top allocation sites and the growth per site since the previous
+report. The endpoint also requires CALC_PROFILE_SECRET and every request
+must be signed like the profiling endpoints (X-Profile header, see
+profiling.sign()). Without a secret nothing is registered: behind a
+reverse proxy every request arrives from a local address, so the client
+address cannot tell local callers apart.
+
+Query parameters:
+- limit: Number of sites listed (default: 10, max: 100)
+- group: 'lineno' (default), 'filename' or 'traceback'
+"""
+import os
+import threading
+import time
+import tracemalloc
+
+from flask import Blueprint, abort, request
+
+from profiling import verify
+from serialization import respond
+
+ENDPOINT = '/debug/memory'
+GROUPS = ('lineno', 'filename', 'traceback')
+
+# Allocations made by tracemalloc and the import system are noise here
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>',
+                 '<frozen importlib._bootstrap_external>', '<unknown>')
+
+
+def load_config():
+    """Read the memory reporting configuration from the environment"""
+    return {
+        'frames': int(os.environ.get('CALC_TRACEMALLOC_FRAMES', '0')),
+        'secret': os.environ.get('CALC_PROFILE_SECRET', ''),
+    }
+
+
+def rss_bytes():
+    """
+    Resident set size of this process
+
+    Returns:
+        int: Current RSS in bytes (peak RSS where the current value is not
+             available), or None if it cannot be determined
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+def _site(statistic, group):
+    frames = statistic.traceback if group == 'traceback' else statistic.traceback[:1]
+    return [f'{frame.filename}:{frame.lineno}' if group != 'filename' else frame.filename
+            for frame in frames]
+
+
+class MemoryTracker:
+    """Takes tracemalloc snapshots and compares each with the previous one"""
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self._previous = None
+        self._previous_time = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def report(self, limit=10, group='lineno'):
+        """
+        Build a memory report
+
+        Args:
+            limit (int): Number of allocation sites listed
+            group (str): 'lineno', 'filename' or 'traceback'
+
+        Returns:
+            dict: traced/peak/RSS bytes, top sites and growth since the
+                  previous report (empty on the first report)
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in IGNORED_FILES]
+        )
+        traced, peak = tracemalloc.get_traced_memory()
+
+        with self._lock:
+            previous, previous_time = self._previous, self._previous_time
+            self._previous, self._previous_time = snapshot, time.monotonic()
+
+        top = [
+            {'site': _site(stat, group), 'size': stat.size, 'count': stat.count}
+            for stat in snapshot.statistics(group)[:limit]
+        ]
+        growth = []
+        if previous is not None:
+            growth = [
+                {'site': _site(stat, group), 'size_diff': stat.size_diff,
+                 'count_diff': stat.count_diff, 'size': stat.size}
+                for stat in snapshot.compare_to(previous, group)[:limit]
+                if stat.size_diff
+            ]
+
+        return {
+            'traced_bytes': traced,
+            'peak_traced_bytes': peak,
+            'rss_bytes': rss_bytes(),
+            'tracemalloc_bytes': tracemalloc.get_tracemalloc_memory(),
+            'top': top,
+            'growth': growth,
+            'seconds_since_previous': (
+                round(time.monotonic() - previous_time, 3) if previous_time is not None else None
+            ),
+        }
+
+
+def create_blueprint(tracker, config):
+    """Debug endpoint serving memory reports"""
+    blueprint = Blueprint('memory', __name__)
+
+    @blueprint.before_request
+    def check_access():
+        if not verify(config['secret'], request.method, request.path, request.headers.get('X-Profile')):
+            abort(404)
+
+    @blueprint.route(ENDPOINT, methods=['GET'])
+    def memory_report():
+        """Report memory use and growth since the previous report"""
+        limit = min(max(request.args.get('limit', default=10, type=int), 1), 100)
+        group = request.args.get('group', 'lineno')
+        if group not in GROUPS:
+            return respond({
+                'success': False,
+                'error': f'group must be one of {list(GROUPS)}'
+            }), 400
+
+        return respond({
+            'success': True,
+            **tracker.report(limit, group)
+        })
+
+    return blueprint
+
+
+def init_app(app, config=None):
+    """
+    Start tracemalloc and register /debug/memory if enabled and a secret is set
+
+    Args:
+        app (Flask): The application
+        config (dict): Overrides load_config() (mainly for tests)
+
+    Returns:
+        bool: True if memory reporting was installed
+    """
+    config = config or load_config()
+    if config['frames'] <= 0 or not config['secret']:
+        return False
+
+    tracker = MemoryTracker(config['frames'])
+    tracker.start()
+    app.register_blueprint(create_blueprint(tracker, config))
+    return True
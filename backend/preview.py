@@ -0,0 +1,107 @@
+"""
+Live preview sessions for the Calculator API
+
+Each client session keeps an IncrementalParser so that successive
+keystrokes only re-tokenize the changed tail of the expression and only
+complete expressions are evaluated, plus the last evaluated
+expression/result so repeated requests are free. Compiled expressions
+come from calculator.compile_cached, so prefixes seen before (backspace,
+retyping, other sessions) are not preprocessed and compiled again.
+Nothing is written to the database.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import calculator
+
+MAX_SESSIONS = 1000
+SESSION_TTL = 600  # seconds
+
+
+class PreviewSession:
+    """Parse state and last result for one client"""
+
+    __slots__ = ('parser', 'last_expression', 'last_response', 'touched', 'lock')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.parser = calculator.IncrementalParser()
+        self.last_expression = None
+        self.last_response = None
+        self.touched = time.monotonic()
+
+
+class PreviewSessions:
+    """
+    Bounded LRU store of preview sessions
+
+    Sessions are evicted when unused for SESSION_TTL seconds or when more
+    than MAX_SESSIONS are active.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """Return the session for an id, creating it if needed"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None or now - session.touched > self.ttl:
+                session = PreviewSession()
+            session.touched = now
+            self._sessions[session_id] = session
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            while self._sessions:
+                oldest = next(iter(self._sessions.values()))
+                if now - oldest.touched <= self.ttl:
+                    break
+                self._sessions.popitem(last=False)
+
+        return session
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+sessions = PreviewSessions()
+
+
+def preview(session_id, expression):
+    """
+    Evaluate an expression for live preview
+
+    Args:
+        session_id (str): Client-chosen session identifier
+        expression (str): Current (possibly incomplete) expression
+
+    Returns:
+        dict: {'status': 'ok', 'result': ...},
+              {'status': 'pending'} or
+              {'status': 'error', 'error': ...}
+    """
+    session = sessions.get(session_id)
+    with session.lock:
+        if expression == session.last_expression:
+            return session.last_response
+
+        status = session.parser.feed(expression)
+        if status == 'pending':
+            response = {'status': 'pending'}
+        elif status == 'invalid':
+            response = {'status': 'error', 'error': 'Invalid expression syntax'}
+        else:
+            try:
+                response = {'status': 'ok', 'result': calculator.compile_cached(expression)()}
+            except calculator.CalculatorError as e:
+                response = {'status': 'error', 'error': str(e)}
+
+        session.last_expression = expression
+        session.last_response = response
+        return response
@@ -0,0 +1,287 @@
+"""
+On-demand request profiling for the Calculator API
+
+Profiling is opt-in and configured through environment variables:
+
+- CALC_PROFILE_SECRET       Enables the signed X-Profile header and the
+                            admin endpoints that list/download profiles
+- CALC_PROFILE_SAMPLE_RATE  Fraction of requests profiled (0.0 - 1.0)
+- CALC_PROFILE_MODE         'cprofile' (pstats output, default) or
+                            'sample' (collapsed stacks for flamegraph.pl)
+- CALC_PROFILE_DIR          Output directory (default: backend/profiles)
+- CALC_PROFILE_KEEP         Number of profiles kept on disk (default: 50)
+
+When neither a secret nor a sample rate is set, init_app() installs
+nothing, so there is no per-request overhead.
+
+A request is profiled when it carries
+    X-Profile: <expires>:hex(HMAC-SHA256(secret, "<METHOD> <path> <expires>"))
+where expires is a unix time at most MAX_SIGNATURE_TTL seconds ahead
+(see sign()), so a leaked header stops working soon. The admin endpoints
+accept the same signature for their own method and path.
+
+cProfile can only run once per process at a time, so a request that
+asks for it while another is being profiled is sampled instead.
+"""
+import cProfile
+import hashlib
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import Blueprint, abort, request, send_from_directory
+
+from serialization import respond
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), 'profiles')
+EXTENSIONS = {'cprofile': '.prof', 'sample': '.folded'}
+ADMIN_PREFIX = '/admin/profiles'
+SIGNATURE_TTL = 300        # default validity of a signature, in seconds
+MAX_SIGNATURE_TTL = 3600   # signatures expiring later than this are rejected
+
+
+def _digest(secret, method, path, expires):
+    message = f'{method.upper()} {path} {expires}'.encode('utf-8')
+    return hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def sign(secret, method, path, ttl=SIGNATURE_TTL, now=None):
+    """
+    Compute the X-Profile header value for a request
+
+    Args:
+        secret (str): Shared profiling secret
+        method (str): HTTP method, e.g. 'POST'
+        path (str): Request path, e.g. '/api/calculate'
+        ttl (int): Seconds the signature stays valid (max MAX_SIGNATURE_TTL)
+        now (float): Current unix time (default: time.time())
+
+    Returns:
+        str: "<expires>:<hex-encoded HMAC-SHA256 signature>"
+    """
+    expires = int((time.time() if now is None else now) + ttl)
+    return f'{expires}:{_digest(secret, method, path, expires)}'
+
+
+def verify(secret, method, path, signature, now=None):
+    """Check an X-Profile signature and its expiry, in constant time"""
+    if not secret or not signature:
+        return False
+    expires, _, digest = signature.partition(':')
+    try:
+        expires = int(expires)
+    except ValueError:
+        return False
+    now = time.time() if now is None else now
+    if not now <= expires <= now + MAX_SIGNATURE_TTL:
+        return False
+    return hmac.compare_digest(_digest(secret, method, path, expires), digest)
+
+
+def load_config():
+    """Read the profiling configuration from the environment"""
+    mode = os.environ.get('CALC_PROFILE_MODE', 'cprofile')
+    if mode not in EXTENSIONS:
+        raise ValueError(f"CALC_PROFILE_MODE must be one of {sorted(EXTENSIONS)}")
+    return {
+        'secret': os.environ.get('CALC_PROFILE_SECRET', ''),
+        'sample_rate': float(os.environ.get('CALC_PROFILE_SAMPLE_RATE', '0')),
+        'mode': mode,
+        'directory': os.environ.get('CALC_PROFILE_DIR', DEFAULT_DIR),
+        'keep': int(os.environ.get('CALC_PROFILE_KEEP', '50')),
+    }
+
+
+class StackSampler:
+    """
+    Low-overhead sampling profiler for a single thread
+
+    A background thread periodically captures the target thread's stack
+    and counts identical stacks, producing Brendan Gregg's collapsed-stack
+    format ("frame;frame;frame count").
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                stack.append(f'{module}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        """Write collapsed stacks to a file"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that profiles selected requests"""
+
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.config = config
+        self._cprofile_lock = threading.Lock()
+        os.makedirs(config['directory'], exist_ok=True)
+
+    def should_profile(self, environ):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(ADMIN_PREFIX):
+            return False
+        signature = environ.get('HTTP_X_PROFILE')
+        if signature:
+            return verify(self.config['secret'], environ.get('REQUEST_METHOD', 'GET'), path, signature)
+        sample_rate = self.config['sample_rate']
+        return sample_rate > 0 and random.random() < sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self.should_profile(environ):
+            return self.wsgi_app(environ, start_response)
+
+        use_cprofile = self.config['mode'] == 'cprofile' and self._cprofile_lock.acquire(blocking=False)
+        started = time.perf_counter()
+        if use_cprofile:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident())
+            profiler.start()
+
+        try:
+            # Consume the body inside the profiler so streaming work is counted
+            response = self.wsgi_app(environ, start_response)
+            try:
+                body = list(response)
+            finally:
+                if hasattr(response, 'close'):
+                    response.close()
+        finally:
+            if use_cprofile:
+                profiler.disable()
+                self._cprofile_lock.release()
+            else:
+                profiler.stop()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._write(profiler, environ, elapsed_ms)
+
+        return body
+
+    def _write(self, profiler, environ, elapsed_ms):
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', environ.get('PATH_INFO', '')).strip('_') or 'root'
+        sampled = isinstance(profiler, StackSampler)
+        name = '{}-{}-{}-{:.1f}ms{}'.format(
+            time.strftime('%Y%m%dT%H%M%S'),
+            environ.get('REQUEST_METHOD', 'GET'),
+            slug,
+            elapsed_ms,
+            EXTENSIONS['sample' if sampled else 'cprofile']
+        )
+        path = os.path.join(self.config['directory'], name)
+        if sampled:
+            profiler.dump(path)
+        else:
+            profiler.dump_stats(path)
+        self._prune()
+
+    def _prune(self):
+        """Keep only the most recent profiles"""
+        profiles = list_profiles(self.config['directory'])
+        for entry in profiles[self.config['keep']:]:
+            try:
+                os.remove(os.path.join(self.config['directory'], entry['name']))
+            except OSError:
+                pass
+
+
+def list_profiles(directory):
+    """
+    List profile files, newest first
+
+    Returns:
+        list: Dictionaries with name, size and modified time
+    """
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and os.path.splitext(entry.name)[1] in EXTENSIONS.values():
+            stat = entry.stat()
+            profiles.append({
+                'name': entry.name,
+                'size': stat.st_size,
+                'modified': stat.st_mtime
+            })
+    profiles.sort(key=lambda p: p['modified'], reverse=True)
+    return profiles
+
+
+def create_blueprint(config):
+    """Admin endpoints for listing and downloading profiles"""
+    blueprint = Blueprint('profiles', __name__)
+
+    @blueprint.before_request
+    def check_signature():
+        if not verify(config['secret'], request.method, request.path, request.headers.get('X-Profile')):
+            abort(404)
+
+    @blueprint.route(ADMIN_PREFIX, methods=['GET'])
+    def list_recent_profiles():
+        """List recent profiles"""
+        profiles = list_profiles(config['directory'])
+        return respond({
+            'success': True,
+            'profiles': profiles,
+            'count': len(profiles)
+        })
+
+    @blueprint.route(f'{ADMIN_PREFIX}/<path:name>', methods=['GET'])
+    def download_profile(name):
+        """Download a single profile file"""
+        return send_from_directory(config['directory'], name, as_attachment=True)
+
+    return blueprint
+
+
+def init_app(app, config=None):
+    """
+    Install request profiling on a Flask app if it is enabled
+
+    Args:
+        app (Flask): The application
+        config (dict): Overrides load_config() (mainly for tests)
+
+    Returns:
+        bool: True if profiling was installed
+    """
+    config = config or load_config()
+    if not config['secret'] and config['sample_rate'] <= 0:
+        return False
+
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, config)
+    if config['secret']:
+        app.register_blueprint(create_blueprint(config))
+    return True
@@ -0,0 +1,313 @@
+"""
+Replay captured traffic against a Calculator API server
+
+Reads requests from a capture log (see capture.py) or from the
+calculations table of a history database, then sends them to a target
+server with N concurrent clients, keeping the recorded spacing between
+requests (optionally sped up or slowed down). Reports throughput, latency
+percentiles and the responses that differ from the recorded ones.
+
+Usage:
+    python replay.py captures/traffic.jsonl [--target URL] [--clients N]
+                     [--speed X] [--limit N] [--json]
+    python replay.py --database calculator.db [...]
+
+--speed 1 replays at the recorded rate, 2 at twice the rate, and 0 sends
+requests as fast as the clients allow. Requests are always dispatched in
+recorded order, so a run is repeatable for the same input.
+"""
+import argparse
+import json
+import math
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from datetime import datetime
+
+DEFAULT_TARGET = 'http://localhost:5000'
+TIMEOUT = 30  # seconds per request
+
+# Fields that legitimately differ between runs
+IGNORED_FIELDS = ('id', 'timestamp')
+
+
+def load_capture(paths):
+    """
+    Read requests from capture logs
+
+    Args:
+        paths (list): Log files, e.g. traffic.jsonl.2 traffic.jsonl.1 traffic.jsonl
+
+    Returns:
+        list: Request records (capture format), ordered by start time
+    """
+    records = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    records.sort(key=lambda record: record['t'])
+    return records
+
+
+def load_calculations(path, limit=None):
+    """
+    Turn saved calculations into POST /api/calculate requests
+
+    Only the result column is compared on replay; results stored as
+    result_data (matrices, complex numbers) are replayed but not compared.
+
+    Args:
+        path (str): SQLite history database
+        limit (int): Most recent calculations to use (default: all)
+
+    Returns:
+        list: Request records (capture format), oldest first
+    """
+    conn = sqlite3.connect(path)
+    try:
+        query = 'SELECT expression, result, timestamp FROM calculations ORDER BY id DESC'
+        params = ()
+        if limit:
+            query += ' LIMIT ?'
+            params = (limit,)
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+    records = []
+    for expression, result, timestamp in reversed(rows):
+        expected = {'success': True}
+        if result is not None:
+            expected['result'] = result
+        records.append({
+            't': _parse_timestamp(timestamp),
+            'm': 'POST',
+            'p': '/api/calculate',
+            'q': '',
+            'h': {'Content-Type': 'application/json'},
+            'b': json.dumps({'expression': expression}),
+            's': 200,
+            'r': json.dumps(expected),
+        })
+    return records
+
+
+def _parse_timestamp(value):
+    """Unix time for a SQLite CURRENT_TIMESTAMP value"""
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile
+
+    Args:
+        values (list): Numbers, in any order
+        p (float): Percentile, 0 - 100
+
+    Returns:
+        float: The percentile, or None for no values
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _same(expected, actual):
+    if isinstance(expected, float) and isinstance(actual, (int, float)):
+        return math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-12)
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        keys = (set(expected) | set(actual)) - set(IGNORED_FIELDS)
+        return all(_same(expected.get(key), actual.get(key)) for key in keys)
+    if isinstance(expected, list) and isinstance(actual, list):
+        return len(expected) == len(actual) and all(map(_same, expected, actual))
+    return expected == actual
+
+
+def diff_response(record, status, body):
+    """
+    Compare a replayed response with the recorded one
+
+    JSON bodies are compared structurally, ignoring IGNORED_FIELDS and
+    floating point noise. Only fields present in the recorded response are
+    compared, so new fields in the candidate build are not reported.
+
+    Args:
+        record (dict): The request record
+        status (int): Replayed status code
+        body (str): Replayed response body
+
+    Returns:
+        str: Description of the difference, or None if they match
+    """
+    if record.get('s') and status != record['s']:
+        return f"status {record['s']} -> {status}"
+    if record.get('r') is None:
+        return None
+
+    try:
+        expected = json.loads(record['r'])
+        actual = json.loads(body)
+    except (TypeError, ValueError):
+        return None if record['r'] == body else 'body differs'
+
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        actual = {key: actual.get(key) for key in expected}
+    if not _same(expected, actual):
+        return f"{json.dumps(expected)[:200]} -> {json.dumps(actual)[:200]}"
+    return None
+
+
+def send(target, record):
+    """
+    Send one recorded request
+
+    Returns:
+        tuple: (status code, response body text); status 0 on connection errors
+    """
+    url = target.rstrip('/') + record['p']
+    if record.get('q'):
+        url += '?' + record['q']
+    data = record['b'].encode('utf-8') if record.get('b') else None
+    req = urllib.request.Request(url, data=data, method=record['m'], headers=record.get('h') or {})
+    try:
+        with urllib.request.urlopen(req, timeout=TIMEOUT) as response:
+            return response.status, response.read().decode('utf-8', 'replace')
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode('utf-8', 'replace')
+    except (urllib.error.URLError, OSError) as e:
+        return 0, str(e)
+
+
+def replay(records, target=DEFAULT_TARGET, clients=4, speed=1.0, sender=send):
+    """
+    Replay requests and collect the results
+
+    Requests are handed out in recorded order. Each is sent no earlier
+    than its recorded offset divided by speed; with speed 0 there is no
+    waiting. If all clients are busy, requests are sent late rather than
+    dropped.
+
+    Args:
+        records (list): Request records, in order
+        target (str): Base URL of the server under test
+        clients (int): Number of concurrent clients
+        speed (float): Rate multiplier (1 = recorded rate, 0 = unthrottled)
+        sender (callable): sender(target, record) -> (status, body)
+
+    Returns:
+        dict: Report with throughput, latency percentiles (ms),
+              status counts and diffs
+    """
+    results = [None] * len(records)
+    next_index = iter(range(len(records)))
+    lock = threading.Lock()
+    first = records[0]['t'] if records else 0
+
+    started = time.perf_counter()
+
+    def client():
+        while True:
+            with lock:
+                index = next(next_index, None)
+            if index is None:
+                return
+            record = records[index]
+            if speed > 0:
+                delay = (record['t'] - first) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            sent = time.perf_counter()
+            status, body = sender(target, record)
+            latency = (time.perf_counter() - sent) * 1000
+            results[index] = (status, latency, diff_response(record, status, body))
+
+    threads = [threading.Thread(target=client) for _ in range(max(clients, 1))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for _, latency, _ in results]
+    recorded = [record['ms'] for record in records if record.get('ms') is not None]
+    diffs = [
+        {'index': index, 'method': record['m'], 'path': record['p'], 'body': record.get('b'), 'diff': diff}
+        for index, (record, (_, _, diff)) in enumerate(zip(records, results)) if diff
+    ]
+    return {
+        'requests': len(records),
+        'clients': clients,
+        'speed': speed,
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(records) / elapsed, 1) if elapsed > 0 else None,
+        'latency_ms': {f'p{p}': percentile(latencies, p) for p in (50, 90, 99)},
+        'recorded_latency_ms': {f'p{p}': percentile(recorded, p) for p in (50, 90, 99)},
+        'statuses': dict(Counter(status for status, _, _ in results)),
+        'errors': sum(1 for status, _, _ in results if status == 0 or status >= 500),
+        'diffs': diffs,
+    }
+
+
+def print_report(report, max_diffs=20):
+    """Print a human-readable report"""
+    def ms(value):
+        return '-' if value is None else f'{value:.2f}'
+
+    print(f"Replayed {report['requests']} requests with {report['clients']} clients "
+          f"at speed {report['speed']:g} in {report['seconds']:.2f} s")
+    print(f"Throughput: {report['throughput']} req/s")
+    print(f"{'latency ms':12} {'p50':>8} {'p90':>8} {'p99':>8}")
+    for label, key in (('replayed', 'latency_ms'), ('recorded', 'recorded_latency_ms')):
+        values = report[key]
+        print(f"{label:12} {ms(values['p50']):>8} {ms(values['p90']):>8} {ms(values['p99']):>8}")
+    print(f"Statuses: {report['statuses']}  errors: {report['errors']}")
+    print(f"Response diffs: {len(report['diffs'])}")
+    for diff in report['diffs'][:max_diffs]:
+        print(f"  #{diff['index']} {diff['method']} {diff['path']} {diff['body'] or ''}")
+        print(f"      {diff['diff']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay captured traffic against a Calculator API server')
+    parser.add_argument('logs', nargs='*', help='capture logs (oldest first)')
+    parser.add_argument('--database', help='replay the calculations table of this SQLite database instead')
+    parser.add_argument('--target', default=DEFAULT_TARGET, help=f'server base URL (default: {DEFAULT_TARGET})')
+    parser.add_argument('--clients', type=int, default=4, help='concurrent clients (default: 4)')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='rate multiplier, 0 for as fast as possible (default: 1)')
+    parser.add_argument('--limit', type=int, help='replay at most this many requests')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    if args.database:
+        records = load_calculations(args.database, args.limit)
+    elif args.logs:
+        records = load_capture(args.logs)
+        if args.limit:
+            records = records[:args.limit]
+    else:
+        parser.error('give capture logs or --database')
+
+    report = replay(records, args.target, args.clients, args.speed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Adaptive sampling of one-variable functions for plotting
+
+The function is first evaluated on a uniform grid, then intervals are
+subdivided where the curve bends (the midpoint is far from the chord),
+where a domain error starts or ends, and around jumps, until the error is
+below half a pixel or the evaluation budget runs out. Jumps that survive
+subdivision down to the minimum width (e.g. tan asymptotes) become gaps.
+
+The samples are reduced to a min/max pair per horizontal pixel, so the
+output size depends only on the pixel budget.
+"""
+import heapq
+import math
+
+MAX_DEPTH = 12            # subdivisions below the initial grid spacing
+EVALUATIONS_PER_PIXEL = 8  # evaluation budget
+
+
+def _robust_span(values):
+    """Height of the plot ignoring the most extreme 5% at each end"""
+    finite = sorted(v for v in values if v is not None)
+    if not finite:
+        return 1.0
+    low = finite[int(len(finite) * 0.05)]
+    high = finite[int((len(finite) - 1) * 0.95)]
+    return (high - low) or max(abs(high), 1.0)
+
+
+def sample(func, x_min, x_max, pixels, errors=(ArithmeticError, ValueError)):
+    """
+    Sample func over [x_min, x_max] for a plot `pixels` wide
+
+    Args:
+        func (callable): f(x) -> float
+        x_min (float): Start of the range
+        x_max (float): End of the range (must be > x_min)
+        pixels (int): Horizontal resolution, i.e. number of output buckets
+        errors (tuple): Exceptions from func that mean "undefined here"
+
+    Returns:
+        dict: {
+            'x': bucket centres,
+            'min': lowest value per bucket (None for gaps),
+            'max': highest value per bucket (None for gaps),
+            'evaluations': number of func calls
+        }
+    """
+    evaluations = 0
+
+    def f(x):
+        nonlocal evaluations
+        evaluations += 1
+        try:
+            y = func(x)
+        except errors:
+            return None
+        # Only real scalars can be plotted; complex/matrix values are gaps
+        if isinstance(y, (int, float)) and math.isfinite(y):
+            return y
+        return None
+
+    # Uniform initial grid
+    step = (x_max - x_min) / pixels
+    xs = [x_min + i * step for i in range(pixels)] + [x_max]
+    points = {x: f(x) for x in xs}
+
+    span = _robust_span(points.values())
+    tolerance = 0.5 * span / pixels     # half a pixel, assuming a square plot
+    min_width = step / (2 ** MAX_DEPTH)
+    budget = pixels * EVALUATIONS_PER_PIXEL
+
+    def score(a, b, ya, yb):
+        """Return (priority, midpoint, midpoint value) for an interval"""
+        m = (a + b) / 2
+        ym = f(m)
+        points[m] = ym
+        if ya is None and yb is None and ym is None:
+            return 0.0, m, ym
+        if ya is None or yb is None or ym is None:
+            return math.inf, m, ym    # locate where the function is undefined
+        return abs(ym - (ya + yb) / 2), m, ym
+
+    heap = []
+
+    def push(a, b):
+        ya, yb = points[a], points[b]
+        priority, m, ym = score(a, b, ya, yb)
+        if priority > tolerance and (b - a) / 2 > min_width:
+            heapq.heappush(heap, (-priority, a, m, b))
+
+    for a, b in zip(xs, xs[1:]):
+        if evaluations >= budget:
+            break
+        push(a, b)
+
+    while heap and evaluations < budget:
+        _, a, m, b = heapq.heappop(heap)
+        push(a, m)
+        push(m, b)
+
+    # Jumps left at the finest resolution are discontinuities, not slopes
+    ordered = sorted(points)
+    breaks = []
+    for a, b in zip(ordered, ordered[1:]):
+        ya, yb = points[a], points[b]
+        if ya is not None and yb is not None and b - a <= 4 * min_width and abs(yb - ya) > span:
+            breaks.append((a + b) / 2)
+
+    # Reduce to min/max per pixel bucket
+    lows = [None] * pixels
+    highs = [None] * pixels
+    gaps = [False] * pixels
+    for x in ordered:
+        y = points[x]
+        index = min(int((x - x_min) / step), pixels - 1)
+        if y is None:
+            continue
+        if lows[index] is None or y < lows[index]:
+            lows[index] = y
+        if highs[index] is None or y > highs[index]:
+            highs[index] = y
+    for x in breaks:
+        gaps[min(int((x - x_min) / step), pixels - 1)] = True
+    for index in range(pixels):
+        if gaps[index]:
+            lows[index] = highs[index] = None
+
+    return {
+        'x': [x_min + (i + 0.5) * step for i in range(pixels)],
+        'min': lows,
+        'max': highs,
+        'evaluations': evaluations
+    }
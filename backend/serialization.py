@@ -0,0 +1,172 @@
+"""
+Response serialization for the Calculator API
+
+Picks the fastest JSON encoder available (orjson, then ujson, then the
+standard library) and lets clients negotiate a more compact format for
+large result sets through the Accept header:
+
+- application/json                         (default)
+- application/vnd.calculator.columnar+json (row lists sent as columns + data)
+- application/msgpack                      (requires the msgpack package)
+"""
+import json
+
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on installed packages
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover - depends on installed packages
+    ujson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on installed packages
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.calculator.columnar+json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+# Keys whose value is a list of uniform row dicts and may be sent column-wise
+COLUMNAR_KEYS = ('calculations', 'results')
+
+
+def _default(obj):
+    """Fallback for values the encoders do not know natively"""
+    if isinstance(obj, complex):
+        return {'re': obj.real, 'im': obj.imag}
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not serializable')
+
+
+def _stdlib_dumps(payload):
+    return json.dumps(payload, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def _orjson_dumps(payload):
+    return orjson.dumps(payload, default=_default)
+
+
+def _ujson_dumps(payload):
+    try:
+        return ujson.dumps(payload, ensure_ascii=False).encode('utf-8')
+    except TypeError:
+        # ujson has no default hook; defer to the standard library
+        return _stdlib_dumps(payload)
+
+
+if orjson is not None:
+    JSON_ENCODER = 'orjson'
+    dumps = _orjson_dumps
+elif ujson is not None:
+    JSON_ENCODER = 'ujson'
+    dumps = _ujson_dumps
+else:
+    JSON_ENCODER = 'json'
+    dumps = _stdlib_dumps
+
+
+def to_columnar(payload):
+    """
+    Convert row lists in a payload into a columnar layout
+
+    {"calculations": [{"id": 1, "result": 4.0}, ...]} becomes
+    {"calculations": {"columns": ["id", "result"], "data": [[1, 4.0], ...]}}
+
+    Args:
+        payload (dict): Response payload
+
+    Returns:
+        dict: New payload with row lists replaced (other keys untouched)
+    """
+    converted = dict(payload)
+    for key in COLUMNAR_KEYS:
+        rows = payload.get(key)
+        if not isinstance(rows, list) or not rows or not isinstance(rows[0], dict):
+            continue
+        columns = list(rows[0])
+        converted[key] = {
+            'columns': columns,
+            'data': [[row.get(column) for column in columns] for row in rows]
+        }
+    return converted
+
+
+def negotiate(accept_header):
+    """
+    Choose a response mimetype from an Accept header
+
+    Args:
+        accept_header (str): Raw Accept header value (may be empty)
+
+    Returns:
+        str: One of the supported mimetypes, JSON if nothing better matches
+    """
+    if not accept_header:
+        return JSON_MIMETYPE
+
+    best, best_quality = JSON_MIMETYPE, -1.0
+    for part in accept_header.split(','):
+        fields = part.strip().split(';')
+        mimetype = fields[0].strip().lower()
+        quality = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if mimetype in MSGPACK_MIMETYPES and msgpack is None:
+            continue
+        if mimetype in (JSON_MIMETYPE, COLUMNAR_MIMETYPE) or mimetype in MSGPACK_MIMETYPES:
+            if quality > best_quality:
+                best, best_quality = mimetype, quality
+
+    return best
+
+
+def encode(payload, mimetype=JSON_MIMETYPE):
+    """
+    Encode a payload for the given mimetype
+
+    Args:
+        payload (dict): Response payload
+        mimetype (str): Result of negotiate()
+
+    Returns:
+        bytes: Encoded body
+    """
+    if mimetype in MSGPACK_MIMETYPES:
+        return msgpack.packb(to_columnar(payload), default=_default, use_bin_type=True)
+    if mimetype == COLUMNAR_MIMETYPE:
+        return dumps(to_columnar(payload))
+    return dumps(payload)
+
+
+def respond(payload):
+    """
+    Build a Flask response for the current request
+
+    Drop-in replacement for jsonify(): the status code can still be
+    returned alongside it, e.g. ``return respond({...}), 400``.
+
+    Args:
+        payload (dict): Response payload
+
+    Returns:
+        flask.Response: Encoded response with the negotiated mimetype
+    """
+    mimetype = negotiate(request.headers.get('Accept', ''))
+    response = Response(encode(payload, mimetype), mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,114 @@
+"""
+Benchmark the scientific functions before and after the lookup tables
+
+"before" is the implementation each function had before the tables (kept
+below); "after" is the current calculator function. Both are timed on
+table hits (keypad-style inputs) and on misses (inputs that fall back to
+the math module). factorial has no misses: every valid input is a hit.
+gamma is new; its "before" is math.gamma with the same domain checks.
+
+Usage:
+    python benchmarks/bench_scientific.py [number]
+"""
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import calculator  # noqa: E402
+
+# The implementations before the lookup tables, domain checks included
+
+def sin_deg(a):
+    return math.sin(math.radians(a))
+
+def cos_deg(a):
+    return math.cos(math.radians(a))
+
+def tan_deg(a):
+    return math.tan(math.radians(a))
+
+def asin_deg(a):
+    if a < -1 or a > 1:
+        raise calculator.CalculatorError("Domain error")
+    return math.degrees(math.asin(a))
+
+def acos_deg(a):
+    if a < -1 or a > 1:
+        raise calculator.CalculatorError("Domain error")
+    return math.degrees(math.acos(a))
+
+def atan_deg(a):
+    return math.degrees(math.atan(a))
+
+def log10(a):
+    if a <= 0:
+        raise calculator.CalculatorError("Logarithm requires positive number")
+    return math.log10(a)
+
+def factorial(n):
+    if n < 0:
+        raise calculator.CalculatorError("Factorial requires non-negative number")
+    if n != int(n):
+        raise calculator.CalculatorError("Factorial requires integer")
+    if n > 170:
+        raise calculator.CalculatorError("Number too large for factorial")
+    return math.factorial(int(n))
+
+def gamma(a):
+    if a <= 0 and a == int(a):
+        raise calculator.CalculatorError("Gamma is undefined at zero and negative integers")
+    return math.gamma(a)
+
+BEFORE = {
+    'sin_deg': sin_deg,
+    'cos_deg': cos_deg,
+    'tan_deg': tan_deg,
+    'asin_deg': asin_deg,
+    'acos_deg': acos_deg,
+    'atan_deg': atan_deg,
+    'log10': log10,
+    'factorial': factorial,
+    'gamma': gamma,
+}
+
+INPUTS = {
+    'sin_deg': ([0, 30, 45, 60, 90, 180, 270], [12.5, 33.3, 0.1]),
+    'cos_deg': ([0, 30, 45, 60, 90, 180, 270], [12.5, 33.3, 0.1]),
+    'tan_deg': ([0, 30, 45, 60, 135, 180], [12.5, 33.3, 0.1]),
+    'asin_deg': ([0, 0.5, 1, -0.5], [0.3, 0.9, -0.7]),
+    'acos_deg': ([0, 0.5, 1, -0.5], [0.3, 0.9, -0.7]),
+    'atan_deg': ([0, 1, -1], [0.3, 2.5, -7.0]),
+    'log10': ([1, 10, 100, 1000, 0.01], [2, 3.7, 12345]),
+    'factorial': ([3, 5, 10, 20, 100, 170], [5.0, 12.0, 150.0]),
+    'gamma': ([1, 5, 0.5, 2.5, 10, 100.5], [0.3, 7.25, 33.3]),
+}
+
+def time_calls(func, values, number):
+    """Seconds per call, best of 3"""
+    def run():
+        for value in values:
+            func(value)
+    return min(timeit.repeat(run, number=number, repeat=3)) / (number * len(values))
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print(f"Scientific function benchmark ({number} rounds)")
+    print("=" * 72)
+    print(f"{'function':12} {'inputs':6} {'before ns':>10} {'after ns':>10} {'speedup':>8}  sample")
+
+    for name, before in BEFORE.items():
+        after = getattr(calculator, name)
+        hits, misses = INPUTS[name]
+        for label, values in (('hits', hits), ('misses', misses)):
+            t_before = time_calls(before, values, number)
+            t_after = time_calls(after, values, number)
+            sample = values[1]
+            print(f"{name:12} {label:6} {t_before * 1e9:10.1f} {t_after * 1e9:10.1f} "
+                  f"{t_before / t_after:7.2f}x  {name}({sample}): {before(sample)!r} -> {after(sample)!r}")
+
+if __name__ == '__main__':
+    main()
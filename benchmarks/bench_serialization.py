@@ -0,0 +1,89 @@
+"""
+Benchmark API response serialization
+
+Compares the original path (sqlite3.Row -> dict copy -> jsonify) with the
+serialization module (dict row factory -> fast encoder / columnar layout).
+
+Usage:
+    python benchmarks/bench_serialization.py [rows] [repeat]
+"""
+import os
+import sqlite3
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from flask import Flask, jsonify  # noqa: E402
+import database  # noqa: E402
+import serialization  # noqa: E402
+
+def build_connection(rows):
+    """In-memory calculations table with the given number of rows"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''
+        CREATE TABLE calculations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            expression TEXT NOT NULL,
+            result REAL NOT NULL,
+            operation_type TEXT,
+            timestamp DATETIME
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO calculations (expression, result, operation_type, timestamp) VALUES (?, ?, ?, ?)',
+        [(f'sin({i}) + {i}', i * 0.5, 'scientific', datetime.now()) for i in range(rows)]
+    )
+    return conn
+
+QUERY = 'SELECT id, expression, result, operation_type, timestamp FROM calculations ORDER BY id DESC'
+
+def baseline(conn):
+    """Original path: sqlite3.Row, per-row dict copy, jsonify"""
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(QUERY).fetchall()
+    calculations = []
+    for row in rows:
+        calculations.append({
+            'id': row['id'],
+            'expression': row['expression'],
+            'result': row['result'],
+            'operation_type': row['operation_type'],
+            'timestamp': row['timestamp']
+        })
+    return jsonify({'success': True, 'calculations': calculations, 'count': len(calculations)}).get_data()
+
+def optimized(conn, mimetype):
+    """New path: dict row factory and serialization.encode"""
+    conn.row_factory = database.dict_factory
+    calculations = conn.execute(QUERY).fetchall()
+    payload = {'success': True, 'calculations': calculations, 'count': len(calculations)}
+    return serialization.encode(payload, mimetype)
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    conn = build_connection(rows)
+    app = Flask(__name__)
+
+    print(f"Serialization benchmark ({rows} rows x {repeat}, encoder: {serialization.JSON_ENCODER})")
+    print("=" * 60)
+
+    with app.app_context():
+        cases = [('baseline (Row + jsonify)', lambda: baseline(conn))]
+        mimetypes = [serialization.JSON_MIMETYPE, serialization.COLUMNAR_MIMETYPE]
+        if serialization.msgpack is not None:
+            mimetypes.append(serialization.MSGPACK_MIMETYPES[0])
+        for mimetype in mimetypes:
+            cases.append((mimetype, lambda m=mimetype: optimized(conn, m)))
+
+        reference = None
+        for name, func in cases:
+            size = len(func())
+            seconds = min(timeit.repeat(func, number=repeat, repeat=3)) / repeat
+            reference = reference or seconds
+            print(f"{name:45} {seconds * 1e3:8.3f} ms  {size:8d} B  x{reference / seconds:5.2f}")
+
+if __name__ == '__main__':
+    main()
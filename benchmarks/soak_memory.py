@@ -0,0 +1,129 @@
+"""
+Soak test: RSS must stay flat over many API requests
+
+Drives the Flask app in-process (test client) with a mix of calculate,
+batch, preview, sample, derivative and history requests, once per history
+store: the bounded in-memory ring and a SQLite file in a temporary
+directory (which grows on disk, but must not grow in memory). RSS is
+measured after a warm-up (caches, preview sessions and the history ring
+filled) and then at checkpoints; a run fails if RSS grows by more than
+--max-growth-mb after its warm-up.
+
+Usage:
+    python benchmarks/soak_memory.py [--requests 1000000] [--warmup 50000]
+                                     [--max-growth-mb 8]
+                                     [--storage memory sqlite]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+# The store app creates on import is replaced for each run
+os.environ.setdefault('CALC_STORAGE', 'memory')
+
+import app  # noqa: E402
+import database  # noqa: E402
+from memory import rss_bytes  # noqa: E402
+
+STORAGES = ('memory', 'sqlite')
+
+PREVIEW_SESSIONS = 2000  # more than preview.MAX_SESSIONS, so eviction is exercised
+
+
+def request_mix(client, i):
+    """Send the i-th request of the mix; expressions vary with i"""
+    kind = i % 10
+    n = i % 997
+    if kind < 4:
+        expression = ('2 + {n}', 'sin({n}) * cos(30)', 'sqrt({n}) + log(100)', '(1 + 2i) * {n}')[kind]
+        response = client.post('/api/calculate', json={'expression': expression.format(n=n)})
+    elif kind == 4:
+        response = client.post('/api/calculate/batch', json={'calculations': [
+            {'client_id': f'c{i}-{j}', 'expression': f'{n} * {j}'} for j in range(5)
+        ]})
+    elif kind in (5, 6):
+        response = client.post('/api/preview', json={
+            'session_id': f'soak-{i % PREVIEW_SESSIONS}',
+            'expression': f'{n} + sin(' if kind == 5 else f'{n} + sin(30)'
+        })
+    elif kind == 7:
+        response = client.post('/api/sample', json={
+            'expression': 'sin(x) * x', 'x_min': 0, 'x_max': 360 + n, 'pixels': 50
+        })
+    elif kind == 8:
+        response = client.post('/api/derivative', json={
+            'expression': 'x**2 * sin(y)', 'variables': ['x', 'y'], 'at': [n, 30]
+        })
+    else:
+        response = client.get('/api/history?limit=10')
+    if response.status_code >= 500:
+        raise RuntimeError(f'request {i} failed: {response.get_data(as_text=True)}')
+
+
+def soak(storage, args, directory):
+    """Run the request mix against one history store; returns peak RSS growth in bytes"""
+    app.store = database.create_store({
+        'CALC_STORAGE': storage,
+        'CALC_MEMORY_CAPACITY': '100',
+        'CALC_DB_PATH': os.path.join(directory, 'calculator.db'),
+    })
+    app.store.init()
+    client = app.app.test_client()
+    started = time.perf_counter()
+
+    for i in range(args.warmup):
+        request_mix(client, i)
+    gc.collect()
+    baseline = rss_bytes()
+
+    print(f"Soak test ({storage} storage): {args.requests} requests after {args.warmup} warm-up requests")
+    print(f"{'requests':>10} {'RSS MB':>8} {'growth MB':>10} {'req/s':>8}")
+    print(f"{0:>10} {baseline / 2**20:8.1f} {0:10.2f} {'':>8}")
+
+    step = max(args.requests // args.checkpoints, 1)
+    peak_growth = 0
+    measured = time.perf_counter()
+    for i in range(args.requests):
+        request_mix(client, args.warmup + i)
+        if (i + 1) % step == 0 or i + 1 == args.requests:
+            gc.collect()
+            growth = rss_bytes() - baseline
+            peak_growth = max(peak_growth, growth)
+            rate = (i + 1) / (time.perf_counter() - measured)
+            print(f"{i + 1:>10} {(baseline + growth) / 2**20:8.1f} {growth / 2**20:10.2f} {rate:8.0f}")
+
+    print(f"Done in {time.perf_counter() - started:.0f} s, peak growth {peak_growth / 2**20:.2f} MB\n")
+    return peak_growth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000000)
+    parser.add_argument('--warmup', type=int, default=50000)
+    parser.add_argument('--max-growth-mb', type=float, default=8.0)
+    parser.add_argument('--checkpoints', type=int, default=10)
+    parser.add_argument('--storage', nargs='+', choices=STORAGES, default=list(STORAGES))
+    args = parser.parse_args()
+
+    if rss_bytes() is None:
+        print("RSS is not available on this platform")
+        return 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        growth = {storage: soak(storage, args, directory) for storage in args.storage}
+
+    for storage, peak_growth in growth.items():
+        assert peak_growth <= args.max_growth_mb * 2**20, (
+            f"RSS grew by {peak_growth / 2**20:.2f} MB with {storage} storage "
+            f"(limit {args.max_growth_mb} MB)"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -39,6 +39,64 @@ async function calculate(expression, operationType = null) {
     }
 }
 
+/**
+ * Calculate and save several expressions in one request
+ * Network errors are passed through unchanged so callers can retry;
+ * errors returned by the server carry the HTTP status in error.status
+ * @param {Array<Object>} calculations - Items with client_id, expression and timestamp
+ * @returns {Promise<Object>} Object with a results array, one entry per item
+ */
+async function calculateBatch(calculations) {
+    const response = await fetch(`${API_BASE}/calculate/batch`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            calculations: calculations
+        })
+    });
+
+    const data = await response.json().catch(() => ({}));
+
+    if (!response.ok) {
+        const error = new Error(data.error || 'Batch calculation failed');
+        error.status = response.status;
+        throw error;
+    }
+
+    return data;
+}
+
+/**
+ * Preview an expression while typing (result is not saved to history)
+ * @param {string} expression - The current, possibly incomplete expression
+ * @param {string} sessionId - Identifies this client's incremental parse state
+ * @param {AbortSignal} signal - Cancels the request when a newer keystroke arrives
+ * @returns {Promise<Object>} Object with status ('ok', 'pending' or 'error') and result
+ */
+async function previewExpression(expression, sessionId, signal) {
+    const response = await fetch(`${API_BASE}/preview`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            expression: expression,
+            session_id: sessionId
+        }),
+        signal: signal
+    });
+
+    const data = await response.json();
+
+    if (!response.ok) {
+        throw new Error(data.error || 'Preview failed');
+    }
+
+    return data;
+}
+
 /**
  * Get calculation history
  * @param {number} limit - Number of records to retrieve (default: 10)
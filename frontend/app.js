@@ -10,6 +10,15 @@ let memoryValue = 0;
 let isError = false;
 let lastResult = null;
 
+// Live preview state
+const PREVIEW_DEBOUNCE_MS = 150;
+const previewSessionId = (window.crypto && crypto.randomUUID)
+    ? crypto.randomUUID()
+    : Math.random().toString(36).slice(2);
+let previewTimer = null;
+let previewController = null;
+let previewedExpression = '';
+
 // DOM Elements
 const expressionDisplay = document.getElementById('expressionDisplay');
 const resultDisplay = document.getElementById('resultDisplay');
@@ -22,6 +31,7 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 function initializeApp() {
+    onHistoryChanged = renderCachedHistory;
     updateDisplay();
     loadHistory();
     setupKeyboardSupport();
@@ -38,6 +48,60 @@ function updateDisplay() {
     if (isError && currentExpression !== '') {
         clearError();
     }
+
+    schedulePreview();
+}
+
+// ==================== Live Preview ====================
+
+function schedulePreview() {
+    if (currentExpression === previewedExpression) {
+        return;
+    }
+
+    cancelPreview();
+    previewedExpression = currentExpression;
+
+    if (!currentExpression || isError) {
+        return;
+    }
+
+    previewTimer = setTimeout(runPreview, PREVIEW_DEBOUNCE_MS);
+}
+
+function cancelPreview() {
+    clearTimeout(previewTimer);
+    previewTimer = null;
+
+    // Drop the in-flight request, its answer would be stale
+    if (previewController) {
+        previewController.abort();
+        previewController = null;
+    }
+}
+
+async function runPreview() {
+    const expression = currentExpression;
+    const controller = new AbortController();
+    previewController = controller;
+
+    try {
+        const response = await previewExpression(expression, previewSessionId, controller.signal);
+
+        if (controller !== previewController || expression !== currentExpression || isError) {
+            return;
+        }
+
+        if (response.status === 'ok') {
+            resultDisplay.textContent = '≈ ' + formatResult(response.result);
+        }
+    } catch (error) {
+        // Aborted or unreachable: preview is best-effort, keep the display as is
+    } finally {
+        if (controller === previewController) {
+            previewController = null;
+        }
+    }
 }
 
 function showError(message) {
@@ -220,36 +284,44 @@ async function calculateClick() {
         return;
     }
 
+    cancelPreview();
+
     try {
         // Show calculating state
         resultDisplay.textContent = 'Calculating...';
 
-        // Call backend API
-        const response = await calculate(currentExpression);
+        // Queue locally; the history cache updates as soon as it syncs
+        const response = await submitCalculation(currentExpression);
 
-        if (response.success) {
-            currentResult = '= ' + response.result;
-            lastResult = response.result;
+        currentResult = '= ' + formatResult(response.result);
+        lastResult = typeof response.result === 'number' ? response.result : null;
+        updateDisplay();
+    } catch (error) {
+        if (error.queued) {
+            currentResult = 'Queued (offline)';
             updateDisplay();
-
-            // Reload history to show new calculation
-            await loadHistory();
         } else {
-            showError(response.error || 'Calculation failed');
+            showError(error.message);
         }
-    } catch (error) {
-        showError(error.message);
     }
 }
 
 // ==================== History Management ====================
 
+async function renderCachedHistory() {
+    displayHistory(await getCachedHistory(10));
+}
+
 async function loadHistory() {
+    // Render the local cache right away, then refresh it from the server
+    await renderCachedHistory();
+
     try {
         const response = await getHistory(10);
 
         if (response.success && response.calculations) {
-            displayHistory(response.calculations);
+            await replaceSyncedHistory(response.calculations);
+            await renderCachedHistory();
         }
     } catch (error) {
         console.error('Failed to load history:', error.message);
@@ -288,7 +360,7 @@ function createHistoryItem(calc) {
     deleteBtn.innerHTML = '×';
     deleteBtn.onclick = (e) => {
         e.stopPropagation();
-        deleteHistoryItem(calc.id);
+        deleteHistoryItem(calc);
     };
 
     header.appendChild(expression);
@@ -296,7 +368,12 @@ function createHistoryItem(calc) {
 
     const result = document.createElement('div');
     result.className = 'history-result';
-    result.textContent = '= ' + calc.result;
+    if (calc.status === 'pending') {
+        result.classList.add('pending');
+        result.textContent = 'Waiting to sync…';
+    } else {
+        result.textContent = '= ' + formatResult(calc.result);
+    }
 
     const timestamp = document.createElement('div');
     timestamp.className = 'history-timestamp';
@@ -310,15 +387,25 @@ function createHistoryItem(calc) {
 }
 
 function reuseCalculation(calc) {
+    if (calc.status === 'pending') {
+        currentExpression = calc.expression;
+        updateDisplay();
+        return;
+    }
+
     currentExpression = calc.expression;
-    currentResult = '= ' + calc.result;
-    lastResult = calc.result;
+    currentResult = '= ' + formatResult(calc.result);
+    lastResult = typeof calc.result === 'number' ? calc.result : null;
     updateDisplay();
 }
 
-async function deleteHistoryItem(id) {
+async function deleteHistoryItem(calc) {
     try {
-        await deleteCalculation(id);
+        // Pending items only exist locally
+        if (calc.id !== null && calc.id !== undefined) {
+            await deleteCalculation(calc.id);
+        }
+        await removeCachedCalculation(calc.client_id);
         await loadHistory();
     } catch (error) {
         console.error('Failed to delete calculation:', error.message);
@@ -330,6 +417,7 @@ async function clearAllHistory() {
     if (confirm('Are you sure you want to clear all history?')) {
         try {
             await clearHistory();
+            await clearCachedHistory();
             await loadHistory();
         } catch (error) {
             console.error('Failed to clear history:', error.message);
@@ -419,4 +507,22 @@ function setupKeyboardSupport() {
 
 // ==================== Utility Functions ====================
 
+/**
+ * Format a result for display
+ * Numbers as is, complex results ({re, im}) as a + bi, matrices as nested brackets
+ */
+function formatResult(value) {
+    if (Array.isArray(value)) {
+        return '[' + value.map(formatResult).join(', ') + ']';
+    }
+    if (value !== null && typeof value === 'object' && 're' in value) {
+        if (value.re === 0) {
+            return value.im + 'i';
+        }
+        const sign = value.im < 0 ? ' - ' : ' + ';
+        return value.re + sign + Math.abs(value.im) + 'i';
+    }
+    return String(value);
+}
+
 console.log('Calculator app loaded successfully');
@@ -0,0 +1,316 @@
+/**
+ * Offline-first history store for Calculator App
+ * Keeps history in IndexedDB so it renders instantly, queues new
+ * calculations locally and syncs them to the backend in batches
+ */
+
+const DB_NAME = 'calculator';
+const DB_VERSION = 1;
+const STORE_NAME = 'calculations';
+
+const SYNC_DELAY_MS = 100;        // collect keypresses into one batch
+const SYNC_BATCH_SIZE = 50;
+const SYNC_MIN_BACKOFF_MS = 1000;
+const SYNC_MAX_BACKOFF_MS = 30000;
+
+let dbPromise = null;
+const memoryRecords = new Map();  // fallback when IndexedDB is unavailable
+
+let syncTimer = null;
+let syncRunning = false;
+let syncBackoffMs = SYNC_MIN_BACKOFF_MS;
+const syncWaiters = new Map();    // client_id -> { resolve, reject }
+
+// Called whenever cached history changes (set by app.js)
+let onHistoryChanged = null;
+
+// ==================== IndexedDB Access ====================
+
+function openDatabase() {
+    if (!dbPromise) {
+        dbPromise = new Promise((resolve) => {
+            if (!window.indexedDB) {
+                resolve(null);
+                return;
+            }
+
+            const request = indexedDB.open(DB_NAME, DB_VERSION);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore(STORE_NAME, { keyPath: 'client_id' });
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => {
+                console.warn('IndexedDB unavailable, history cache kept in memory');
+                resolve(null);
+            };
+        });
+    }
+    return dbPromise;
+}
+
+/**
+ * Run a callback against the object store inside one transaction
+ * @param {string} mode - 'readonly' or 'readwrite'
+ * @param {Function} callback - Receives the object store, may return an IDBRequest
+ * @returns {Promise<*>} The request's result once the transaction completes
+ */
+async function withStore(mode, callback) {
+    const db = await openDatabase();
+
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction(STORE_NAME, mode);
+        const request = callback(transaction.objectStore(STORE_NAME));
+        transaction.oncomplete = () => resolve(request ? request.result : undefined);
+        transaction.onerror = () => reject(transaction.error);
+    });
+}
+
+async function getAllRecords() {
+    if (!(await openDatabase())) {
+        return Array.from(memoryRecords.values());
+    }
+    return withStore('readonly', store => store.getAll());
+}
+
+async function putRecords(records) {
+    if (!(await openDatabase())) {
+        records.forEach(record => memoryRecords.set(record.client_id, record));
+        return;
+    }
+    await withStore('readwrite', store => {
+        records.forEach(record => store.put(record));
+    });
+}
+
+async function deleteRecords(clientIds) {
+    if (!(await openDatabase())) {
+        clientIds.forEach(clientId => memoryRecords.delete(clientId));
+        return;
+    }
+    await withStore('readwrite', store => {
+        clientIds.forEach(clientId => store.delete(clientId));
+    });
+}
+
+function timestampValue(record) {
+    return Date.parse(record.timestamp) || 0;
+}
+
+function newClientId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+
+function notifyHistoryChanged() {
+    if (onHistoryChanged) {
+        onHistoryChanged();
+    }
+}
+
+// ==================== Cached History ====================
+
+/**
+ * Get the latest cached calculations, pending ones included
+ * @param {number} limit - Number of records to return
+ * @returns {Promise<Array>} Records, newest first
+ */
+async function getCachedHistory(limit = 10) {
+    const records = await getAllRecords();
+    records.sort((a, b) => timestampValue(b) - timestampValue(a));
+    return records.slice(0, limit);
+}
+
+/**
+ * Replace synced records with the server's view of history
+ * Pending (not yet synced) records are kept
+ * @param {Array} calculations - Rows from GET /api/history
+ */
+async function replaceSyncedHistory(calculations) {
+    const records = await getAllRecords();
+    const stale = records.filter(record => record.status === 'synced').map(record => record.client_id);
+
+    await deleteRecords(stale);
+    await putRecords(calculations.map(calc => ({
+        ...calc,
+        client_id: 'server-' + calc.id,
+        status: 'synced'
+    })));
+}
+
+async function removeCachedCalculation(clientId) {
+    syncWaiters.delete(clientId);
+    await deleteRecords([clientId]);
+}
+
+async function clearCachedHistory() {
+    const records = await getAllRecords();
+    syncWaiters.clear();
+    await deleteRecords(records.map(record => record.client_id));
+}
+
+// ==================== Sync Queue ====================
+
+/**
+ * Queue a calculation and sync it in the next batch
+ * @param {string} expression - The expression to calculate
+ * @returns {Promise<Object>} Server record once synced. Rejects with
+ *          error.queued = true if the server is unreachable (the
+ *          calculation stays queued and syncs later)
+ */
+async function submitCalculation(expression) {
+    const record = {
+        client_id: newClientId(),
+        id: null,
+        expression: expression,
+        result: null,
+        operation_type: null,
+        timestamp: new Date().toISOString(),
+        status: 'pending'
+    };
+
+    await putRecords([record]);
+    notifyHistoryChanged();
+
+    const synced = new Promise((resolve, reject) => {
+        syncWaiters.set(record.client_id, { resolve, reject });
+    });
+    scheduleSync(SYNC_DELAY_MS);
+
+    return synced;
+}
+
+function scheduleSync(delay) {
+    clearTimeout(syncTimer);
+    syncTimer = setTimeout(syncPending, delay);
+}
+
+/**
+ * Send pending calculations to the server in batches
+ * Retries with exponential backoff while the server is unreachable or
+ * failing (5xx). A batch the server rejects (4xx) would fail the same way
+ * on every retry, so its records are dropped and their callers rejected.
+ */
+async function syncPending() {
+    if (syncRunning) {
+        // Pick up records queued during the running sync afterwards
+        scheduleSync(SYNC_DELAY_MS);
+        return;
+    }
+    syncRunning = true;
+    let pending = [];
+
+    try {
+        while (true) {
+            pending = (await getAllRecords())
+                .filter(record => record.status === 'pending')
+                .sort((a, b) => timestampValue(a) - timestampValue(b))
+                .slice(0, SYNC_BATCH_SIZE);
+
+            if (pending.length === 0) {
+                break;
+            }
+
+            const response = await calculateBatch(pending.map(record => ({
+                client_id: record.client_id,
+                expression: record.expression,
+                timestamp: record.timestamp
+            })));
+
+            await reconcile(response.results);
+        }
+        syncBackoffMs = SYNC_MIN_BACKOFF_MS;
+    } catch (error) {
+        if (error.status >= 400 && error.status < 500) {
+            console.warn('Sync batch rejected, dropping it:', error.message);
+            await rejectRecords(pending, error);
+            syncBackoffMs = SYNC_MIN_BACKOFF_MS;
+            scheduleSync(0);
+            return;
+        }
+
+        console.warn(`Sync failed, retrying in ${syncBackoffMs} ms:`, error.message);
+
+        // Let callers know their calculation is queued rather than lost
+        syncWaiters.forEach(waiter => {
+            const queued = new Error('Saved offline, will sync when the server is reachable');
+            queued.queued = true;
+            waiter.reject(queued);
+        });
+        syncWaiters.clear();
+
+        scheduleSync(syncBackoffMs);
+        syncBackoffMs = Math.min(syncBackoffMs * 2, SYNC_MAX_BACKOFF_MS);
+    } finally {
+        syncRunning = false;
+    }
+}
+
+/**
+ * Drop records the server will never accept and reject their callers
+ * @param {Array} records - Pending records from the rejected batch
+ * @param {Error} error - The server's error
+ */
+async function rejectRecords(records, error) {
+    await deleteRecords(records.map(record => record.client_id));
+
+    records.forEach(record => {
+        const waiter = syncWaiters.get(record.client_id);
+        if (waiter) {
+            syncWaiters.delete(record.client_id);
+            waiter.reject(error);
+        }
+    });
+
+    notifyHistoryChanged();
+}
+
+/**
+ * Apply batch results: adopt server ids/results, drop rejected expressions
+ * @param {Array} results - Items from POST /api/calculate/batch
+ */
+async function reconcile(results) {
+    const synced = [];
+    const rejected = [];
+
+    results.forEach(item => {
+        if (item.success) {
+            synced.push({
+                client_id: item.client_id,
+                id: item.id,
+                expression: item.expression,
+                result: item.result,
+                operation_type: item.operation_type,
+                timestamp: item.timestamp,
+                status: 'synced'
+            });
+        } else {
+            rejected.push(item.client_id);
+        }
+    });
+
+    await putRecords(synced);
+    await deleteRecords(rejected);
+
+    results.forEach(item => {
+        const waiter = syncWaiters.get(item.client_id);
+        if (!waiter) {
+            return;
+        }
+        syncWaiters.delete(item.client_id);
+        if (item.success) {
+            waiter.resolve(item);
+        } else {
+            waiter.reject(new Error(item.error || 'Calculation failed'));
+        }
+    });
+
+    notifyHistoryChanged();
+}
+
+// Retry right away when the browser comes back online
+window.addEventListener('online', () => scheduleSync(0));
+
+// Sync anything left over from a previous visit
+scheduleSync(SYNC_DELAY_MS);
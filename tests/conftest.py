@@ -0,0 +1,29 @@
+"""
+Shared test setup
+
+The backend modules import each other as top-level modules (app.py runs
+from the backend directory), so that directory is put on sys.path for
+tests of the Flask app, its middleware and blueprints.
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Flask test client with history in a temporary SQLite file"""
+    # app creates its store on import; keep that one off disk, then swap it
+    monkeypatch.setenv('CALC_STORAGE', 'memory')
+    import app
+    import database
+
+    store = database.SQLiteStore(str(tmp_path / 'calculator.db'))
+    store.init()
+    monkeypatch.setattr(app, 'store', store)
+    return app.app.test_client()
@@ -0,0 +1,186 @@
+"""
+HTTP tests for the Calculator API endpoints
+"""
+import math
+import uuid
+import pytest
+
+def new_session():
+    return uuid.uuid4().hex
+
+def test_preview(client):
+    """Test preview statuses while an expression is typed"""
+    session = new_session()
+
+    def preview(expression):
+        response = client.post('/api/preview', json={'session_id': session, 'expression': expression})
+        assert response.status_code == 200
+        return response.get_json()
+
+    assert preview('2 +')['status'] == 'pending'
+    assert preview('2 + sin(')['status'] == 'pending'
+    body = preview('2 + sin(30)')
+    assert body['status'] == 'ok' and body['result'] == 2.5
+    assert preview('2 + sin(30))')['status'] == 'error'
+    assert preview('1 / 0') == {
+        'success': True, 'expression': '1 / 0', 'status': 'error', 'error': 'Division by zero'
+    }
+    # Backspacing to an earlier expression gives the same answer
+    assert preview('2 + sin(30)')['result'] == 2.5
+
+def test_preview_reuses_compiled_expressions(client):
+    """Test complete expressions seen before are not compiled again"""
+    import calculator
+    calculator.compile_cached.cache_clear()
+    for session in (new_session(), new_session()):
+        client.post('/api/preview', json={'session_id': session, 'expression': '7 * 6'})
+    info = calculator.compile_cached.cache_info()
+    assert info.misses == 1 and info.hits == 1
+
+def test_preview_requires_body(client):
+    """Test a missing body is rejected"""
+    response = client.post('/api/preview', data='', content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+def test_preview_does_not_save(client):
+    """Test previews are not written to history"""
+    client.post('/api/preview', json={'session_id': new_session(), 'expression': '2 + 2'})
+    assert client.get('/api/history').get_json()['calculations'] == []
+
+def test_calculate_batch(client):
+    """Test each batch item succeeds or fails on its own"""
+    response = client.post('/api/calculate/batch', json={'calculations': [
+        {'client_id': 'a', 'expression': '2 + 2', 'timestamp': '2026-01-11T14:30:00'},
+        {'client_id': 'b', 'expression': '1 / 0'},
+        {'client_id': 'c', 'expression': '3 * 3', 'operation_type': 'bogus'},
+        {'client_id': {'nested': 1}, 'expression': '1 + 1'},
+        {'client_id': 'd', 'expression': 'sin(30)', 'operation_type': 'scientific'},
+    ]})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [item['success'] for item in results] == [True, False, False, False, True]
+    assert results[0]['result'] == 4.0
+    assert results[0]['timestamp'] == '2026-01-11 14:30:00'
+    assert results[1]['error'] == 'Division by zero'
+    assert 'operation_type' in results[2]['error']
+    assert 'client_id' in results[3]['error']
+    assert results[4]['operation_type'] == 'scientific'
+
+    history = client.get('/api/history').get_json()['calculations']
+    assert sorted(calc['id'] for calc in history) == sorted([results[0]['id'], results[4]['id']])
+
+def test_calculate_batch_retry(client):
+    """Test retrying a batch with the same client_ids does not duplicate rows"""
+    batch = {'calculations': [
+        {'client_id': 'retry-1', 'expression': '1 + 1', 'timestamp': '2026-01-11T14:30:00'},
+        {'client_id': 'retry-2', 'expression': '2 + 2', 'timestamp': '2026-01-11T14:31:00'},
+    ]}
+    first = client.post('/api/calculate/batch', json=batch).get_json()['results']
+    second = client.post('/api/calculate/batch', json=batch).get_json()['results']
+    assert [item['id'] for item in second] == [item['id'] for item in first]
+    assert len(client.get('/api/history').get_json()['calculations']) == 2
+
+def test_calculate_batch_rejects_bad_requests(client):
+    """Test malformed batches are rejected as a whole"""
+    assert client.post('/api/calculate/batch', json={}).status_code == 400
+    assert client.post('/api/calculate/batch', json={'calculations': 'nope'}).status_code == 400
+    too_many = [{'expression': '1'}] * 101
+    assert client.post('/api/calculate/batch', json={'calculations': too_many}).status_code == 400
+
+def test_calculate_rejects_unknown_operation_type(client):
+    """Test /api/calculate validates operation_type"""
+    response = client.post('/api/calculate', json={'expression': '2 + 2', 'operation_type': 'bogus'})
+    assert response.status_code == 400
+    assert client.get('/api/history').get_json()['calculations'] == []
+
+def test_sample(client):
+    """Test sampling returns one min/max pair per pixel"""
+    response = client.post('/api/sample', json={
+        'expression': 'sqrt(t)', 'variable': 't', 'x_min': -1, 'x_max': 4, 'pixels': 10
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['variable'] == 't'
+    assert len(body['x']) == len(body['min']) == len(body['max']) == 10
+    assert body['min'][0] is None
+    assert body['max'][-1] == pytest.approx(2.0, abs=0.01)
+
+@pytest.mark.parametrize('data', [
+    {},
+    {'expression': 'x', 'x_min': 'a', 'x_max': 1},
+    {'expression': 'x', 'x_min': 0},
+    {'expression': 'x', 'x_min': 1, 'x_max': 0},
+    {'expression': 'x', 'x_min': 0, 'x_max': float('inf')},
+    {'expression': 'x', 'x_min': 0, 'x_max': 1, 'pixels': 1},
+    {'expression': 'x', 'x_min': 0, 'x_max': 1, 'pixels': 4001},
+    {'expression': 'x', 'variable': 'x y', 'x_min': 0, 'x_max': 1},
+    {'expression': 'e * 2', 'variable': 'e', 'x_min': 0, 'x_max': 1},
+    {'expression': 'x +', 'x_min': 0, 'x_max': 1},
+    {'expression': 'x + det(inv(eye(500)) @ eye(500))', 'x_min': 0, 'x_max': 1, 'pixels': 200},
+    {'expression': 'x + trace([[x]])', 'x_min': 0, 'x_max': 1},
+])
+def test_sample_rejects_bad_requests(client, data):
+    """Test invalid sample requests get a 400 with an error message"""
+    response = client.post('/api/sample', json=data)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+def test_derivative_at_point(client):
+    """Test one point in each accepted format gives the value and gradient"""
+    for at in ([3, 30], {'x': 3, 'y': 30}):
+        response = client.post('/api/derivative', json={
+            'expression': 'x**2 * sin(y)', 'variables': ['x', 'y'], 'at': at
+        })
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['value'] == pytest.approx(4.5)
+        assert body['gradient'] == pytest.approx([3.0, 9 * math.cos(math.radians(30)) * math.pi / 180])
+
+    body = client.post('/api/derivative', json={'expression': 'x**3', 'variables': 'x', 'at': 2}).get_json()
+    assert body['variables'] == ['x']
+    assert (body['value'], body['gradient']) == (8.0, [12.0])
+
+def test_derivative_at_points(client):
+    """Test many points report undefined ones per point"""
+    response = client.post('/api/derivative', json={'expression': 'sqrt(x)', 'points': [4, 0, [1]]})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert results[0] == {'value': 2.0, 'gradient': [0.25], 'error': None}
+    assert results[1]['value'] is None and results[1]['error']
+    assert results[2]['gradient'] == [0.5]
+
+@pytest.mark.parametrize('data', [
+    {},
+    {'expression': 'x', 'variables': ['x y'], 'at': 1},
+    {'expression': 'x', 'variables': [1], 'at': 1},
+    {'expression': 'x'},
+    {'expression': 'x', 'points': []},
+    {'expression': 'x', 'points': [1] * 10001},
+    {'expression': 'x * y', 'variables': ['x', 'y'], 'at': [1]},
+    {'expression': 'x * y', 'variables': ['x', 'y'], 'at': {'x': 1}},
+    {'expression': 'x', 'at': True},
+    {'expression': 'x', 'at': 'a'},
+    {'expression': 'x', 'at': float('nan')},
+    {'expression': 'e * 2', 'variables': ['e'], 'at': 3},
+    {'expression': 'x +', 'at': 1},
+    {'expression': '1 / x', 'at': 0},
+])
+def test_derivative_rejects_bad_requests(client, data):
+    """Test invalid derivative requests get a 400 with an error message"""
+    response = client.post('/api/derivative', json=data)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+def test_parse_point():
+    """Test points become values in variable order"""
+    from app import parse_point
+    assert parse_point({'y': 2, 'x': 1}, ['x', 'y']) == [1.0, 2.0]
+    assert parse_point([1, 2], ['x', 'y']) == [1.0, 2.0]
+    assert parse_point(5, ['x']) == [5.0]
+    for point in ([1, 2], [True], [float('inf')], {'y': 1}):
+        with pytest.raises((TypeError, ValueError, KeyError)):
+            parse_point(point, ['x'])
+
+if __name__ == "__main__":
+    pytest.main([__file__])
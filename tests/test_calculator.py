@@ -8,8 +8,9 @@ from backend.calculator import (
     add, subtract, multiply, divide, power,
     square, cube, sqrt, cbrt,
     sin_deg, cos_deg, tan_deg, asin_deg, acos_deg, atan_deg,
-    log10, ln, exp, factorial, absolute, reciprocal, modulo,
-    preprocess_expression, evaluate_expression, determine_operation_type
+    log10, ln, exp, factorial, gamma, absolute, reciprocal, modulo,
+    preprocess_expression, evaluate_expression, determine_operation_type,
+    tokenize_expression, IncrementalParser, compile_expression, compile_gradient
 )
 
 def test_arithmetic_operations():
@@ -71,6 +72,55 @@ def test_trigonometric_functions():
     with pytest.raises(CalculatorError):
         acos_deg(1.1)  # Out of domain
 
+def test_exact_table_values():
+    """Test common inputs are answered exactly from the lookup tables"""
+    assert sin_deg(30) == 0.5
+    assert sin_deg(150) == 0.5
+    assert sin_deg(180) == 0
+    assert sin_deg(-90) == -1
+    assert sin_deg(390) == 0.5
+    # Integral angles of any size are reduced to one period
+    assert sin_deg(1080) == 0
+    assert sin_deg(-1050.0) == 0.5
+    assert cos_deg(3600060) == 0.5
+    assert tan_deg(180 * 10 ** 30 + 45) == 1
+    with pytest.raises(CalculatorError):
+        tan_deg(-810)
+    assert cos_deg(60) == 0.5
+    assert cos_deg(90) == 0
+    assert cos_deg(180) == -1
+    assert tan_deg(45) == 1
+    assert tan_deg(135) == -1
+    assert tan_deg(180) == 0
+    assert tan_deg(60) == math.sqrt(3)
+    with pytest.raises(CalculatorError):
+        tan_deg(90)
+    with pytest.raises(CalculatorError):
+        tan_deg(-90)
+
+    assert asin_deg(0.5) == 30
+    assert asin_deg(-1) == -90
+    assert acos_deg(0.5) == 60
+    assert acos_deg(-1) == 180
+    assert atan_deg(1) == 45
+    assert atan_deg(-math.sqrt(3)) == -60
+
+    assert log10(100) == 2
+    assert log10(1e-5) == -5
+    assert log10(1e300) == 300
+    assert factorial(170) == math.factorial(170)
+    assert gamma(5) == 24
+    assert gamma(171) == float(math.factorial(170))
+    # sqrt(pi) correctly rounded; math.sqrt(math.pi) is an ulp low
+    assert gamma(0.5) == 1.772453850905516
+    assert gamma(2.5) == 1.329340388179137
+    assert gamma(171.5) == pytest.approx(math.gamma(171.5), rel=1e-13)
+
+    # Table misses still use the general path
+    assert sin_deg(30.5) == math.sin(math.radians(30.5))
+    assert log10(2) == math.log10(2)
+    assert evaluate_expression("sin(30)") == 0.5
+
 def test_logarithmic_functions():
     """Test logarithmic functions"""
     assert abs(log10(100) - 2) < 1e-10
@@ -99,6 +149,13 @@ def test_other_functions():
         factorial(3.5)
     with pytest.raises(CalculatorError):
         factorial(171)  # Too large
+
+    assert gamma(-0.5) == pytest.approx(-2 * math.sqrt(math.pi))
+    assert gamma(0.3) == math.gamma(0.3)
+    assert evaluate_expression("gamma(6)") == 120
+    for n in (0, -2, 172):
+        with pytest.raises(CalculatorError):
+            gamma(n)
     
     assert absolute(-5) == 5
     assert absolute(5) == 5
@@ -206,5 +263,193 @@ def test_edge_cases():
     assert absolute(0) == 0
     assert cbrt(0) == 0
 
+def test_compile_expression():
+    """Test compiled expressions with variables"""
+    f = compile_expression("sin(x) + x**2", ('x',))
+    assert f(30) == pytest.approx(900.5)
+    assert f(0) == 0
+    g = compile_expression("exp(-x/50) + e", ('x',))
+    assert g(0) == pytest.approx(1 + math.e)
+    h = compile_expression("x × y", ('x', 'y'))
+    assert h(3, 4) == 12
+    with pytest.raises(CalculatorError):
+        compile_expression("sqrt(x)", ('x',))(-1)
+    with pytest.raises(CalculatorError):
+        compile_expression("sin(", ('x',))
+    with pytest.raises(CalculatorError):
+        compile_expression("y", ('x',))(1)
+
+@pytest.mark.parametrize('name', ['sqrt', 'e', 'i', 'sin', 'asin', 'log', 'abs', 'ln', 'sin_deg'])
+def test_compile_expression_reserved_names(name):
+    """Test names the expression would read as constants or functions cannot be variables"""
+    with pytest.raises(CalculatorError, match='reserved'):
+        compile_expression(f"{name} + 1", (name,))
+
+def test_tokenize_expression():
+    """Test expression tokenization"""
+    assert tokenize_expression("2 + 3") == [
+        ('number', '2', 0), ('operator', '+', 2), ('number', '3', 4)
+    ]
+    assert [t[0] for t in tokenize_expression("sin(30)×π")] == [
+        'name', 'lparen', 'number', 'rparen', 'operator', 'constant'
+    ]
+    assert [t[0] for t in tokenize_expression("5!")] == ['number', 'postfix']
+    assert tokenize_expression("2 $")[-1] == ('invalid', '$', 2)
+
+def test_incremental_parser():
+    """Test incremental parsing status and prefix reuse"""
+    parser = IncrementalParser()
+    assert parser.feed("") == 'pending'
+    assert parser.feed("2") == 'complete'
+    assert parser.feed("2 +") == 'pending'
+    assert parser.feed("2 + (") == 'pending'
+    assert parser.feed("2 + (3") == 'pending'
+    assert parser.feed("2 + (3)") == 'complete'
+    assert parser.reused == 3
+
+    # Typing extends the last token instead of adding a new one
+    assert parser.feed("2 + (31)") == 'complete'
+    assert [t[1] for t in parser.tokens] == ['2', '+', '(', '31', ')']
+
+    # Backspace reuses the shared prefix too
+    assert parser.feed("2 + (") == 'pending'
+    assert parser.reused == 2
+
+    assert parser.feed("sin") == 'pending'
+    assert parser.feed("e") == 'complete'
+    assert parser.feed("3.") == 'pending'
+    assert parser.feed("3)") == 'invalid'
+    assert parser.feed("3 $") == 'invalid'
+
+    # Invalid state is dropped again by backspacing
+    assert parser.feed("(1))") == 'invalid'
+    assert parser.feed("(1)") == 'complete'
+    assert parser.feed("(1) $") == 'invalid'
+    assert parser.feed("(1) ") == 'complete'
+
+    # Reused state matches a fresh parse
+    fresh = IncrementalParser()
+    fresh.feed("2 × (4 + 5")
+    parser.feed("2 × (4 +")
+    parser.feed("2 × (4 + 5")
+    assert parser.tokens == fresh.tokens
+    assert parser.depths == fresh.depths
+    assert parser.floors == fresh.floors
+    assert parser.broken == fresh.broken
+
+def test_complex_mode():
+    """Test complex results are opt-in"""
+    with pytest.raises(CalculatorError):
+        evaluate_expression("sqrt(-1)")
+    assert evaluate_expression("sqrt(-1)", complex_mode=True) == 1j
+    assert evaluate_expression("(1 + 2i) * (3 - i)") == 5 + 5j
+    assert evaluate_expression("i ** 2") == -1
+    assert evaluate_expression("ln(-1)", complex_mode=True) == pytest.approx(math.pi * 1j)
+    # Operators cannot bypass the opt-in either
+    for expression in ("(-1)**0.5", "(-8)**(1/3)"):
+        with pytest.raises(CalculatorError, match='complex mode'):
+            evaluate_expression(expression)
+    assert evaluate_expression("(-1)**0.5", complex_mode=True) == pytest.approx(1j)
+    assert evaluate_expression("(-8)**(1/3)", complex_mode=True) == pytest.approx(1 + math.sqrt(3) * 1j)
+    assert evaluate_expression("(-8)**(1/3) + 0i") == pytest.approx(1 + math.sqrt(3) * 1j)
+    assert determine_operation_type("2 + 3i") == 'complex'
+    assert determine_operation_type("sqrt(-4)", 2j) == 'complex'
+
+def test_matrix_expressions():
+    """Test matrix literals and linear algebra functions"""
+    pytest.importorskip("numpy")
+    assert evaluate_expression("det([[1, 2], [3, 4]])") == pytest.approx(-2)
+    assert evaluate_expression("[[1, 2], [3, 4]] @ [1, 1]") == [3, 7]
+    assert evaluate_expression("inv([[2, 0], [0, 4]])") == [[0.5, 0], [0, 0.25]]
+    assert evaluate_expression("solve([[2, 0], [0, 4]], [2, 8])") == [1, 2]
+    assert evaluate_expression("transpose([[1, 2]])") == [[1], [2]]
+    assert evaluate_expression("trace(eye(3))") == 3
+    with pytest.raises(CalculatorError):
+        evaluate_expression("inv([[1, 2], [2, 4]])")
+    with pytest.raises(CalculatorError):
+        evaluate_expression("det([[1, 2, 3]])")
+    assert determine_operation_type("det([[1, 2], [3, 4]])") == 'matrix'
+    assert determine_operation_type("[1, 2] + [3, 4]") == 'matrix'
+
+def test_compile_gradient():
+    """Test forward-mode derivatives, including the degree factor"""
+    deg = math.pi / 180
+    value, grad = compile_gradient("sin(x)")(30)
+    assert value == 0.5
+    assert grad[0] == pytest.approx(math.cos(math.radians(30)) * deg)
+    assert compile_gradient("tan(x)")(45)[1][0] == pytest.approx(2 * deg)
+    assert compile_gradient("asin(x)")(0.5)[1][0] == pytest.approx(1 / (deg * math.sqrt(0.75)))
+
+    value, grad = compile_gradient("x**2 * y + ln(x) - atan(y)", ('x', 'y'))(2, 1)
+    assert value == pytest.approx(4 + math.log(2) - 45)
+    assert grad == pytest.approx((4.5, 4 - 1 / (2 * deg)))
+
+    assert compile_gradient("2**x / x")(3)[1][0] == pytest.approx((8 * math.log(2) * 3 - 8) / 9)
+    assert compile_gradient("exp(sqrt(x)) + abs(x)")(4)[1][0] == pytest.approx(math.exp(2) / 4 + 1)
+    assert compile_gradient("5! + 3")(1) == (123.0, (0.0,))
+
+    # Matches a central finite difference
+    h = 1e-6
+    f = compile_expression("cos(x) * log(x) + x % 7", ('x',))
+    numeric = (f(20 + h) - f(20 - h)) / (2 * h)
+    assert compile_gradient("cos(x) * log(x) + x % 7")(20)[1][0] == pytest.approx(numeric, rel=1e-6)
+
+    with pytest.raises(CalculatorError):
+        compile_gradient("sqrt(x)")(0)
+    with pytest.raises(CalculatorError):
+        compile_gradient("1 / x")(0)
+    with pytest.raises(CalculatorError):
+        compile_gradient("x + 2i")
+    with pytest.raises(CalculatorError):
+        compile_gradient("det([[x]])")
+    with pytest.raises(CalculatorError, match='not differentiable'):
+        compile_gradient("gamma(x)")(3)
+
+@pytest.mark.parametrize('name', ['e', 'i', 'sin', 'cos', 'tan', 'log', 'sqrt', 'cbrt', 'exp', 'abs'])
+def test_compile_gradient_reserved_names(name):
+    """Test constants and function names cannot be differentiation variables"""
+    with pytest.raises(CalculatorError, match='reserved'):
+        compile_gradient(f"{name} * 2", (name,))
+
+def test_shared_namespace_not_modified():
+    """Test expressions cannot change the shared evaluation namespace"""
+    assert evaluate_expression("(sqrt := 3) + 1") == 4
+    assert evaluate_expression("sqrt(16)") == 4
+    f = compile_expression("(x := x + 1) * 2", ('x',))
+    assert f(1) == 4 and f(1) == 4
+    # In a comprehension := would bind in the (shared) globals
+    for expression in ("{(sqrt := absolute) for x in (1,)}", "[(sin_deg := cos_deg) for x in (1,)]",
+                       "(lambda: (sqrt := absolute))()"):
+        with pytest.raises(CalculatorError):
+            evaluate_expression(expression)
+    with pytest.raises(CalculatorError):
+        evaluate_expression("sqrt(-4)")
+    assert evaluate_expression("sin(0)") == 0
+
+@pytest.mark.parametrize('expression', [
+    "1 + (__builtins__.update(q=41) or 0)",
+    "1 + (sin_deg.__globals__['SAFE_GLOBALS'].update(sqrt=absolute) or 0)",
+    "1 + (sqrt.__globals__['COMPLEX_GLOBALS'].update(sqrt=absolute) or 0)",
+    "__builtins__",
+    "(lambda: 0).__code__",
+    "1 .real",
+    "[1, 2].tofile",
+    'eye(2).\\\ntofile("/tmp/x")',
+    '(eye(2). #c\n tofile("/tmp/x"))',
+    "pow(a=1, b=2)",
+    "{1: 2}",
+])
+def test_namespace_escape_rejected(expression):
+    """Test attributes and underscore names cannot reach the shared namespaces"""
+    with pytest.raises(CalculatorError):
+        evaluate_expression(expression)
+    with pytest.raises(CalculatorError):
+        evaluate_expression("q + 1")
+    with pytest.raises(CalculatorError):
+        evaluate_expression("sqrt(-4)")
+    assert evaluate_expression("sqrt(-4)", complex_mode=True) == 2j
+    with pytest.raises(CalculatorError, match='reserved'):
+        compile_expression("x", ('_x',))
+
 if __name__ == "__main__":
     pytest.main([__file__])
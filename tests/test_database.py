@@ -0,0 +1,291 @@
+"""
+Conformance tests for the history storage backends
+"""
+import os
+import sqlite3
+import time
+from datetime import datetime
+import pytest
+from backend.database import (
+    HistoryStore, SQLiteStore, MemoryRingStore, PartitionedSQLiteStore,
+    PartitionLimitError, create_store, encode_result, decode_result
+)
+
+BACKENDS = {
+    'sqlite': lambda tmp_path: SQLiteStore(str(tmp_path / 'calculator.db')),
+    'memory': lambda tmp_path: MemoryRingStore(capacity=100),
+    'partitioned-month': lambda tmp_path: PartitionedSQLiteStore(str(tmp_path), 'month'),
+    'partitioned-client': lambda tmp_path: PartitionedSQLiteStore(str(tmp_path), 'client'),
+}
+
+@pytest.fixture(params=sorted(BACKENDS))
+def store(request, tmp_path):
+    store = BACKENDS[request.param](tmp_path)
+    store.init()
+    return store
+
+def test_save_and_get_history(store):
+    """Test saved calculations come back newest first with all fields"""
+    first = store.save_calculation("2 + 2", 4.0, 'arithmetic', client='alice')
+    time.sleep(0.001)
+    second = store.save_calculation("sin(30)", 0.5, 'scientific', client='bob')
+
+    assert isinstance(first, int) and isinstance(second, int)
+    assert first != second
+
+    history = store.get_history()
+    assert [calc['id'] for calc in history] == [second, first]
+    assert history[0]['expression'] == "sin(30)"
+    assert history[0]['result'] == 0.5
+    assert history[0]['operation_type'] == 'scientific'
+    assert history[0]['timestamp']
+
+def test_history_limit(store):
+    """Test the limit parameter"""
+    for i in range(15):
+        store.save_calculation(f"{i} + 1", i + 1.0, 'arithmetic')
+    assert len(store.get_history()) == 10
+    assert len(store.get_history(3)) == 3
+    assert store.get_history(1)[0]['expression'] == "14 + 1"
+
+def test_save_calculations(store):
+    """Test bulk saves return IDs in input order"""
+    ids = store.save_calculations([
+        ("1 + 1", 2.0, 'arithmetic', None),
+        ("2 + 2", 4.0, 'arithmetic', '2026-01-11 14:30:00'),
+        ("3 + 3", 6.0, 'arithmetic', datetime(2026, 1, 11, 14, 31)),
+    ])
+    assert len(ids) == len(set(ids)) == 3
+    by_id = {calc['id']: calc for calc in store.get_history()}
+    assert [by_id[i]['expression'] for i in ids] == ["1 + 1", "2 + 2", "3 + 3"]
+    assert by_id[ids[1]]['timestamp'].startswith('2026-01-11 14:30:00')
+
+def test_save_calculations_client_ids(store):
+    """Test a retried batch returns the original IDs without saving twice"""
+    batch = [
+        ("1 + 1", 2.0, 'arithmetic', '2026-01-11 14:30:00'),
+        ("2 + 2", 4.0, 'arithmetic', '2026-01-11 14:31:00'),
+    ]
+    ids = store.save_calculations(batch, client='alice', client_ids=['c1', 'c2'])
+    assert store.save_calculations(batch, client='alice', client_ids=['c1', 'c2']) == ids
+
+    more = store.save_calculations(
+        [("3 + 3", 6.0, 'arithmetic', '2026-01-11 15:00:00'), ("4 + 4", 8.0, 'arithmetic', None)],
+        client='alice', client_ids=['c2', None]
+    )
+    assert more[0] == ids[1]
+    assert more[1] not in ids
+    assert len(store.get_history()) == 3
+
+def test_sqlite_migrates_baseline_schema(tmp_path):
+    """Test the original schema (REAL NOT NULL result, two operation types) is rebuilt"""
+    path = str(tmp_path / 'baseline.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE calculations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            expression TEXT NOT NULL,
+            result REAL NOT NULL,
+            operation_type TEXT CHECK(operation_type IN ('arithmetic', 'scientific')),
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO calculations (expression, result, operation_type, timestamp) VALUES (?, ?, ?, ?)', [
+            ('1 + 1', 2.0, 'arithmetic', '2026-01-11 14:30:00'),
+            ('sin(30)', 0.5, 'scientific', '2026-01-11 14:31:00'),
+            ('3 + 3', 6.0, 'arithmetic', '2026-01-11 14:32:00'),
+        ]
+    )
+    conn.execute('DELETE FROM calculations WHERE id = 3')  # the highest id so far
+    conn.commit()
+    conn.close()
+
+    store = SQLiteStore(path)
+    store.init()
+    history = store.get_history()
+    assert [(calc['id'], calc['expression'], calc['result'], calc['operation_type'], calc['timestamp'])
+            for calc in history] == [
+        (2, 'sin(30)', 0.5, 'scientific', '2026-01-11 14:31:00'),
+        (1, '1 + 1', 2.0, 'arithmetic', '2026-01-11 14:30:00'),
+    ]
+
+    # New columns and operation types work, and deleted ids are not reused
+    ids = store.save_calculations([
+        ("sqrt(-4)", 2j, 'complex', None),
+        ("[1, 2]", [1.0, 2.0], 'matrix', None),
+    ], client_ids=['c1', None])
+    assert ids == [4, 5]
+    assert store.save_calculations([("sqrt(-4)", 2j, 'complex', None)], client_ids=['c1']) == [4]
+    assert store.get_history(1)[0]['result'] == [1.0, 2.0]
+
+    conn = sqlite3.connect(path)
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    conn.close()
+    assert 'calculations_v1' not in tables
+
+def test_sqlite_migrates_client_id(tmp_path):
+    """Test databases created before client_id existed are upgraded"""
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE calculations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            expression TEXT NOT NULL,
+            result REAL,
+            result_data BLOB,
+            operation_type TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute("INSERT INTO calculations (expression, result, operation_type) VALUES ('1 + 1', 2.0, 'arithmetic')")
+    conn.commit()
+    conn.close()
+
+    store = SQLiteStore(path)
+    store.init()
+    store.init()
+    ids = store.save_calculations([("2 + 2", 4.0, 'arithmetic', None)], client_ids=['c1'])
+    assert store.save_calculations([("2 + 2", 4.0, 'arithmetic', None)], client_ids=['c1']) == ids
+    assert [calc['expression'] for calc in store.get_history()] == ["2 + 2", "1 + 1"]
+
+def test_non_scalar_results(store):
+    """Test complex and matrix results round-trip"""
+    ids = store.save_calculations([
+        ("sqrt(-4)", 2j, 'complex', None),
+        ("[1, 2] * 2", [2.0, 4.0], 'matrix', None),
+        ("inv([[2, 0], [0, 4]])", [[0.5, 0.0], [0.0, 0.25]], 'matrix', None),
+    ])
+    by_id = {calc['id']: calc for calc in store.get_history()}
+    assert by_id[ids[0]]['result'] == 2j
+    assert by_id[ids[1]]['result'] == [2.0, 4.0]
+    assert by_id[ids[2]]['result'] == [[0.5, 0.0], [0.0, 0.25]]
+
+def test_encode_result():
+    """Test the result_data encoding"""
+    assert encode_result(3) == (3.0, None)
+    for value in (1 - 2j, [1.0, 2.5], [[1.0, 2.0], [3.0, 4.0]], [[1j, 2.0]]):
+        result, data = encode_result(value)
+        assert result is None
+        assert decode_result(data) == value
+
+def test_delete_calculation(store):
+    """Test deleting one calculation"""
+    keep = store.save_calculation("1 + 1", 2.0, 'arithmetic')
+    remove = store.save_calculation("2 + 2", 4.0, 'arithmetic')
+    assert store.delete_calculation(remove) is True
+    assert store.delete_calculation(remove) is False
+    assert store.delete_calculation(987654321) is False
+    assert [calc['id'] for calc in store.get_history()] == [keep]
+
+def test_clear_history(store):
+    """Test clearing all calculations"""
+    assert store.clear_history() == 0
+    store.save_calculation("1 + 1", 2.0, 'arithmetic', client='alice')
+    store.save_calculation("2 + 2", 4.0, 'arithmetic', client='bob')
+    assert store.clear_history() == 2
+    assert store.get_history() == []
+
+def test_memory_ring_keeps_latest():
+    """Test the ring buffer evicts the oldest calculations"""
+    store = MemoryRingStore(capacity=3)
+    ids = [store.save_calculation(f"{i}", float(i), 'arithmetic') for i in range(5)]
+    assert [calc['id'] for calc in store.get_history()] == ids[:1:-1]
+    assert store.delete_calculation(ids[0]) is False
+
+def test_partitions_and_drop(tmp_path):
+    """Test partitioned storage writes one file per partition and drops whole ones"""
+    store = PartitionedSQLiteStore(str(tmp_path), 'month')
+    store.init()
+    old = store.save_calculation("1 + 1", 2.0, 'arithmetic', timestamp='2025-12-31 23:59:00')
+    new = store.save_calculation("2 + 2", 4.0, 'arithmetic', timestamp='2026-01-01 00:00:00')
+
+    assert [key for _, key in store.partitions()] == ['2025-12', '2026-01']
+    assert os.path.exists(tmp_path / 'calculations-2025-12.db')
+    assert [calc['id'] for calc in store.get_history()] == [new, old]
+
+    assert store.drop_partition('2025-12') is True
+    assert store.drop_partition('2025-12') is False
+    assert not os.path.exists(tmp_path / 'calculations-2025-12.db')
+    assert [calc['id'] for calc in store.get_history()] == [new]
+
+    # IDs of dropped partitions are not reused
+    again = store.save_calculation("3 + 3", 6.0, 'arithmetic', timestamp='2025-12-01 00:00:00')
+    assert again not in (old, new)
+
+def test_partitions_merge_by_timestamp(tmp_path):
+    """Test history across partitions is newest first by timestamp, not by id"""
+    store = PartitionedSQLiteStore(str(tmp_path), 'client')
+    store.init()
+    a = store.save_calculation("a", 1.0, 'arithmetic', timestamp='2026-01-11 10:00:00', client='alice')
+    b = store.save_calculation("b", 2.0, 'arithmetic', timestamp='2026-01-11 08:00:00', client='bob')
+    c = store.save_calculation("c", 3.0, 'arithmetic', timestamp='2026-01-11 09:00:00', client='bob')
+    assert [calc['id'] for calc in store.get_history()] == [a, c, b]
+    assert [calc['id'] for calc in store.get_history(2)] == [a, c]
+
+def test_partitions_read_only_as_needed(tmp_path, monkeypatch):
+    """Test history stops at partitions that cannot hold the newest records"""
+    store = PartitionedSQLiteStore(str(tmp_path), 'month')
+    store.init()
+    for month in range(1, 13):
+        store.save_calculation(f"{month}", float(month), 'arithmetic', timestamp=f'2025-{month:02d}-01 12:00:00')
+    store.clear_history()
+    store.save_calculation("new", 0.0, 'arithmetic', timestamp='2026-01-01 12:00:00')
+    store.save_calculation("older", 0.0, 'arithmetic', timestamp='2025-12-01 12:00:00')
+
+    opened = []
+    select_history = SQLiteStore._select_history
+    monkeypatch.setattr(SQLiteStore, '_select_history',
+                        lambda self, *args: opened.append(self.path) or select_history(self, *args))
+    assert [calc['expression'] for calc in store.get_history(1)] == ["new"]
+    assert len(opened) == 1
+    opened.clear()
+    assert [calc['expression'] for calc in store.get_history()] == ["new", "older"]
+    assert len(opened) == 2
+
+    opened.clear()
+    monkeypatch.setattr(SQLiteStore, 'clear_history', lambda self: opened.append(self.path) or 0)
+    store.clear_history()
+    assert len(opened) == 2
+
+def test_partition_limit(tmp_path):
+    """Test partition keys from request data cannot create unlimited files"""
+    store = PartitionedSQLiteStore(str(tmp_path), 'client', max_partitions=2)
+    store.init()
+    store.save_calculation("1", 1.0, 'arithmetic', client='alice')
+    store.save_calculation("2", 2.0, 'arithmetic', client='bob')
+    store.save_calculation("3", 3.0, 'arithmetic', client='alice')
+    with pytest.raises(PartitionLimitError):
+        store.save_calculation("4", 4.0, 'arithmetic', client='mallory')
+    assert len(os.listdir(tmp_path)) == 3  # manifest and two partitions
+
+def test_history_store_is_abstract():
+    """Test backends must implement the whole interface"""
+    class Incomplete(HistoryStore):
+        def get_history(self, limit=10):
+            return []
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_create_store(tmp_path):
+    """Test backend selection from configuration"""
+    assert isinstance(create_store({}), SQLiteStore)
+    assert isinstance(create_store({'CALC_STORAGE': 'memory'}), MemoryRingStore)
+    store = create_store({
+        'CALC_STORAGE': 'partitioned',
+        'CALC_PARTITION_DIR': str(tmp_path),
+        'CALC_PARTITION_BY': 'client'
+    })
+    assert isinstance(store, PartitionedSQLiteStore)
+    assert store.partition_by == 'client'
+    assert store.max_partitions == 1000
+    store = create_store({'CALC_STORAGE': 'partitioned', 'CALC_MAX_PARTITIONS': '5'})
+    assert store.max_partitions == 5
+    with pytest.raises(ValueError):
+        create_store({'CALC_STORAGE': 'redis'})
+    with pytest.raises(ValueError):
+        PartitionedSQLiteStore(str(tmp_path), 'year')
+
+if __name__ == "__main__":
+    pytest.main([__file__])
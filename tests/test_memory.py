@@ -0,0 +1,44 @@
+"""
+Unit tests for the tracemalloc memory report
+"""
+import tracemalloc
+import pytest
+from flask import Flask
+import memory
+from profiling import sign
+
+SECRET = 'test-secret'
+
+@pytest.fixture
+def report_client():
+    was_tracing = tracemalloc.is_tracing()
+    app = Flask(__name__)
+    assert memory.init_app(app, {'frames': 1, 'secret': SECRET})
+    yield app.test_client()
+    if not was_tracing:
+        tracemalloc.stop()
+
+def test_report_requires_signature(report_client):
+    """Test the report is hidden without a valid signature, even locally"""
+    assert report_client.get('/debug/memory').status_code == 404
+    assert report_client.get('/debug/memory', headers={
+        'X-Profile': sign('wrong', 'GET', '/debug/memory')
+    }).status_code == 404
+
+    response = report_client.get('/debug/memory?limit=3', headers={
+        'X-Profile': sign(SECRET, 'GET', '/debug/memory')
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['success']
+    assert len(data['top']) <= 3
+
+def test_init_app_requires_secret():
+    """Test nothing is registered without frames or without a secret"""
+    for config in ({'frames': 0, 'secret': SECRET}, {'frames': 1, 'secret': ''}):
+        app = Flask(__name__)
+        assert not memory.init_app(app, config)
+        assert 'memory' not in app.blueprints
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,170 @@
+"""
+Unit tests for on-demand request profiling
+"""
+import os
+import threading
+import time
+import pytest
+from flask import Flask
+import profiling
+from profiling import ProfilingMiddleware, sign, verify, list_profiles
+
+SECRET = 'test-secret'
+
+def make_config(tmp_path, **overrides):
+    config = {
+        'secret': SECRET,
+        'sample_rate': 0.0,
+        'mode': 'cprofile',
+        'directory': str(tmp_path),
+        'keep': 50,
+    }
+    config.update(overrides)
+    return config
+
+class ClosingBody:
+    """WSGI response iterable that records whether it was closed"""
+
+    def __init__(self):
+        self.closed = False
+
+    def __iter__(self):
+        yield b'ok'
+
+    def close(self):
+        self.closed = True
+
+def call(middleware, path='/api/calculate', method='POST', signature=None):
+    environ = {'REQUEST_METHOD': method, 'PATH_INFO': path}
+    if signature:
+        environ['HTTP_X_PROFILE'] = signature
+    return b''.join(middleware(environ, lambda status, headers, exc_info=None: None))
+
+def test_sign_and_verify():
+    """Test signatures are bound to method, path, secret and expiry"""
+    now = 1_000_000
+    signature = sign(SECRET, 'post', '/api/calculate', now=now)
+    assert signature.startswith(f'{now + profiling.SIGNATURE_TTL}:')
+    assert verify(SECRET, 'POST', '/api/calculate', signature, now=now)
+    assert verify(SECRET, 'POST', '/api/calculate', signature, now=now + profiling.SIGNATURE_TTL)
+
+    assert not verify(SECRET, 'GET', '/api/calculate', signature, now=now)
+    assert not verify(SECRET, 'POST', '/api/history', signature, now=now)
+    assert not verify('other', 'POST', '/api/calculate', signature, now=now)
+    assert not verify('', 'POST', '/api/calculate', signature, now=now)
+    assert not verify(SECRET, 'POST', '/api/calculate', None, now=now)
+    assert not verify(SECRET, 'POST', '/api/calculate', 'garbage', now=now)
+
+    # Expired, or valid for longer than allowed
+    assert not verify(SECRET, 'POST', '/api/calculate', signature, now=now + profiling.SIGNATURE_TTL + 1)
+    too_long = sign(SECRET, 'POST', '/api/calculate', ttl=profiling.MAX_SIGNATURE_TTL + 60, now=now)
+    assert not verify(SECRET, 'POST', '/api/calculate', too_long, now=now)
+
+    # Tampering with the expiry breaks the signature
+    expires, digest = signature.split(':')
+    assert not verify(SECRET, 'POST', '/api/calculate', f'{int(expires) + 60}:{digest}', now=now)
+
+def test_middleware_selects_requests(tmp_path):
+    """Test only signed (or sampled) requests are profiled"""
+    app = lambda environ, start_response: [b'ok']
+    middleware = ProfilingMiddleware(app, make_config(tmp_path))
+
+    assert call(middleware) == b'ok'
+    assert call(middleware, signature=sign('wrong', 'POST', '/api/calculate')) == b'ok'
+    assert list_profiles(str(tmp_path)) == []
+
+    call(middleware, signature=sign(SECRET, 'POST', '/api/calculate'))
+    profiles = list_profiles(str(tmp_path))
+    assert len(profiles) == 1
+    assert profiles[0]['name'].endswith('.prof')
+    assert '-POST-api_calculate-' in profiles[0]['name']
+
+    # Admin paths are never profiled
+    call(middleware, path='/admin/profiles', method='GET',
+         signature=sign(SECRET, 'GET', '/admin/profiles'))
+    assert len(list_profiles(str(tmp_path))) == 1
+
+    sampled = ProfilingMiddleware(app, make_config(tmp_path / 'sampled', secret='', sample_rate=1.0, mode='sample'))
+    call(sampled)
+    assert [p['name'][-7:] for p in list_profiles(str(tmp_path / 'sampled'))] == ['.folded']
+
+def test_middleware_closes_response(tmp_path):
+    """Test the wrapped app's iterable is closed (WSGI requirement)"""
+    body = ClosingBody()
+    middleware = ProfilingMiddleware(lambda environ, start_response: body, make_config(tmp_path, sample_rate=1.0))
+    assert call(middleware) == b'ok'
+    assert body.closed
+
+def test_concurrent_cprofile_falls_back_to_sampling(tmp_path):
+    """Test a second request profiled at the same time is sampled"""
+    entered = threading.Event()
+    release = threading.Event()
+
+    def slow_app(environ, start_response):
+        if environ['PATH_INFO'] == '/slow':
+            entered.set()
+            release.wait(5)
+        return [b'ok']
+
+    middleware = ProfilingMiddleware(slow_app, make_config(tmp_path, sample_rate=1.0))
+    thread = threading.Thread(target=call, args=(middleware, '/slow'))
+    thread.start()
+    assert entered.wait(5)
+    call(middleware, '/fast')
+    release.set()
+    thread.join()
+
+    names = sorted(p['name'] for p in list_profiles(str(tmp_path)))
+    assert any('fast' in name and name.endswith('.folded') for name in names)
+    assert any('slow' in name and name.endswith('.prof') for name in names)
+
+def test_prune_keeps_latest(tmp_path):
+    """Test old profiles are removed beyond the keep limit"""
+    for i in range(5):
+        path = tmp_path / f'old-{i}.prof'
+        path.write_text('x')
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    (tmp_path / 'notes.txt').write_text('not a profile')
+
+    middleware = ProfilingMiddleware(lambda e, s: [b'ok'], make_config(tmp_path, keep=2))
+    middleware._prune()
+
+    assert sorted(os.listdir(tmp_path)) == ['notes.txt', 'old-3.prof', 'old-4.prof']
+
+@pytest.fixture
+def admin(tmp_path):
+    (tmp_path / 'a.prof').write_bytes(b'data')
+    app = Flask(__name__)
+    assert profiling.init_app(app, make_config(tmp_path))
+    return app.test_client()
+
+def test_admin_requires_signature(admin):
+    """Test admin endpoints are hidden without a valid signature"""
+    assert admin.get('/admin/profiles').status_code == 404
+    assert admin.get('/admin/profiles', headers={
+        'X-Profile': sign('wrong', 'GET', '/admin/profiles')
+    }).status_code == 404
+    assert admin.get('/admin/profiles/a.prof', headers={
+        'X-Profile': sign(SECRET, 'GET', '/admin/profiles')
+    }).status_code == 404
+
+    response = admin.get('/admin/profiles', headers={'X-Profile': sign(SECRET, 'GET', '/admin/profiles')})
+    assert response.status_code == 200
+    assert [p['name'] for p in response.get_json()['profiles']] == ['a.prof']
+
+    response = admin.get('/admin/profiles/a.prof', headers={
+        'X-Profile': sign(SECRET, 'GET', '/admin/profiles/a.prof')
+    })
+    assert response.status_code == 200
+    assert response.data == b'data'
+
+def test_init_app_disabled():
+    """Test nothing is installed when profiling is not configured"""
+    app = Flask(__name__)
+    wsgi_app = app.wsgi_app
+    assert not profiling.init_app(app, {'secret': '', 'sample_rate': 0.0, 'mode': 'cprofile',
+                                        'directory': '', 'keep': 50})
+    assert app.wsgi_app == wsgi_app
+
+if __name__ == "__main__":
+    pytest.main([__file__])
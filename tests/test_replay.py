@@ -0,0 +1,185 @@
+"""
+Unit tests for traffic capture and replay
+"""
+import io
+import json
+import sqlite3
+import threading
+import pytest
+from backend.capture import CaptureMiddleware
+from backend.replay import (
+    load_capture, load_calculations, percentile, diff_response, replay
+)
+
+def echo_app(environ, start_response):
+    """WSGI app answering with the request body"""
+    body = environ['wsgi.input'].read(int(environ.get('CONTENT_LENGTH') or 0))
+    start_response('201 Created', [('Content-Type', 'application/json')])
+    return [b'{"echo": ', body or b'null', b'}']
+
+def call(app, body=b'', path='/api/calculate', method='POST'):
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_X_CLIENT_ID': 'alice',
+        'wsgi.input': io.BytesIO(body),
+    }
+    return b''.join(app(environ, lambda status, headers, exc_info=None: None))
+
+def test_capture_records_requests(tmp_path):
+    """Test captured lines hold request, response and timing"""
+    config = {'sample_rate': 1.0, 'directory': str(tmp_path), 'max_bytes': 10000, 'backups': 2}
+    app = CaptureMiddleware(echo_app, config)
+
+    assert call(app, b'{"expression": "2 + 2"}') == b'{"echo": {"expression": "2 + 2"}}'
+    call(app, path='/admin/profiles', method='GET')
+
+    records = load_capture([str(tmp_path / 'traffic.jsonl')])
+    assert len(records) == 1
+    record = records[0]
+    assert record['m'] == 'POST' and record['p'] == '/api/calculate'
+    assert record['h'] == {'Content-Type': 'application/json', 'X-Client-Id': 'alice'}
+    assert json.loads(record['b']) == {'expression': '2 + 2'}
+    assert record['s'] == 201
+    assert json.loads(record['r']) == {'echo': {'expression': '2 + 2'}}
+    assert record['ms'] >= 0
+
+def test_capture_skips_chunked_bodies(tmp_path):
+    """Test a body without Content-Length reaches the app and is not captured"""
+    config = {'sample_rate': 1.0, 'directory': str(tmp_path), 'max_bytes': 10000, 'backups': 2}
+    received = []
+
+    def reading_app(environ, start_response):
+        received.append(environ['wsgi.input'].read())
+        start_response('200 OK', [])
+        return [b'ok']
+
+    app = CaptureMiddleware(reading_app, config)
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': '/api/calculate',
+        'HTTP_TRANSFER_ENCODING': 'chunked',
+        'wsgi.input': io.BytesIO(b'{"expression": "2 + 2"}'),
+        'wsgi.input_terminated': True,
+    }
+    assert b''.join(app(environ, lambda status, headers, exc_info=None: None)) == b'ok'
+    assert received == [b'{"expression": "2 + 2"}']
+    assert load_capture([str(tmp_path / 'traffic.jsonl')]) == []
+
+def test_capture_rotates(tmp_path):
+    """Test the log rotates and keeps a bounded number of files"""
+    config = {'sample_rate': 1.0, 'directory': str(tmp_path), 'max_bytes': 500, 'backups': 2}
+    app = CaptureMiddleware(echo_app, config)
+    for i in range(50):
+        call(app, json.dumps({'expression': f'{i} + 1'}).encode())
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        'traffic.jsonl', 'traffic.jsonl.1', 'traffic.jsonl.2'
+    ]
+
+def test_percentile():
+    """Test nearest-rank percentiles"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3, 1, 2], 0) == 1
+    assert percentile([], 50) is None
+
+def test_diff_response():
+    """Test response comparison ignores ids, timestamps and float noise"""
+    record = {'p': '/api/calculate', 's': 200,
+              'r': '{"success": true, "result": 0.5, "id": 1, "timestamp": "a"}'}
+    assert diff_response(record, 200, '{"success": true, "result": 0.5000000000001, "id": 7, "extra": 1}') is None
+    assert diff_response(record, 400, '{}') == 'status 200 -> 400'
+    assert diff_response(record, 200, '{"success": true, "result": 0.6}')
+
+def test_load_calculations(tmp_path):
+    """Test the calculations table becomes calculate requests, oldest first"""
+    path = str(tmp_path / 'calculator.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE calculations (id INTEGER PRIMARY KEY, expression TEXT, '
+                 'result REAL, result_data BLOB, operation_type TEXT, timestamp DATETIME)')
+    conn.executemany('INSERT INTO calculations (expression, result, timestamp) VALUES (?, ?, ?)', [
+        ('1 + 1', 2.0, '2026-01-11 14:30:00'),
+        ('2 + 2', 4.0, '2026-01-11 14:30:02'),
+        ('3 + 3', 6.0, '2026-01-11 14:30:03'),
+    ])
+    conn.commit()
+    conn.close()
+
+    records = load_calculations(path, limit=2)
+    assert [json.loads(r['b'])['expression'] for r in records] == ['2 + 2', '3 + 3']
+    assert records[1]['t'] - records[0]['t'] == 1
+    assert diff_response(records[0], 200, '{"success": true, "result": 4.0, "id": 9}') is None
+
+def test_replay_report():
+    """Test replay sends every request once and reports diffs"""
+    records = [
+        {'t': 100.0 + i * 0.01, 'm': 'POST', 'p': '/api/calculate', 'b': str(i),
+         's': 200, 'r': json.dumps({'result': i}), 'ms': 1.0}
+        for i in range(20)
+    ]
+    sent = []
+
+    def sender(target, record):
+        sent.append(record['b'])
+        result = -1 if record['b'] == '7' else int(record['b'])
+        return 200, json.dumps({'result': result})
+
+    report = replay(records, 'http://test', clients=3, speed=0, sender=sender)
+    assert sorted(sent, key=int) == [str(i) for i in range(20)]
+    assert report['requests'] == 20
+    assert report['statuses'] == {200: 20}
+    assert report['errors'] == 0
+    assert [d['index'] for d in report['diffs']] == [7]
+    assert report['latency_ms']['p50'] is not None
+    assert report['recorded_latency_ms']['p99'] == 1.0
+
+class FakeClock:
+    """Stands in for the time module: sleep() advances perf_counter()"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+        self.lock = threading.Lock()
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+@pytest.mark.parametrize('speed', [1, 4])
+def test_replay_keeps_recorded_spacing(monkeypatch, speed):
+    """Test requests are sent at their recorded offsets, scaled by speed"""
+    clock = FakeClock()
+    monkeypatch.setattr('backend.replay.time', clock)
+    records = [
+        {'t': 100.0 + i * 0.01, 'm': 'POST', 'p': '/api/calculate', 'b': str(i), 's': 200, 'r': None}
+        for i in range(20)
+    ]
+    sent_at = []
+
+    def sender(target, record):
+        sent_at.append(clock.now)
+        return 200, '{}'
+
+    report = replay(records, 'http://test', clients=1, speed=speed, sender=sender)
+    assert report['requests'] == 20
+    assert clock.sleeps == pytest.approx([0.01 / speed] * 19)
+    assert sent_at == pytest.approx([i * 0.01 / speed for i in range(20)])
+
+def test_replay_unthrottled_does_not_sleep(monkeypatch):
+    """Test speed 0 sends without waiting"""
+    clock = FakeClock()
+    monkeypatch.setattr('backend.replay.time', clock)
+    records = [{'t': 100.0 + i, 'm': 'GET', 'p': '/api/history'} for i in range(5)]
+    replay(records, 'http://test', clients=2, speed=0, sender=lambda target, record: (200, '{}'))
+    assert clock.sleeps == []
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,49 @@
+"""
+Unit tests for adaptive plot sampling
+"""
+import math
+import pytest
+from backend.sampling import sample
+
+def test_output_bounded_by_pixels():
+    """Test output has one min/max pair per pixel whatever the range"""
+    for x_max in (1, 1000, 1e6):
+        series = sample(math.sin, 0, x_max, 50)
+        assert len(series['x']) == len(series['min']) == len(series['max']) == 50
+        assert series['evaluations'] <= 50 * 8 + 2
+
+def test_min_max_per_bucket():
+    """Test buckets hold the min and max of the samples inside them"""
+    series = sample(lambda x: x, 0, 10, 10)
+    assert series['x'][0] == pytest.approx(0.5)
+    for i in range(10):
+        assert i <= series['min'][i] <= series['max'][i] <= i + 1
+    assert series['min'][0] == 0
+    assert series['max'][-1] == 10
+
+def test_adaptive_refinement():
+    """Test curved regions get more samples than straight ones"""
+    line = sample(lambda x: 2 * x + 1, -1, 1, 100)
+    curve = sample(lambda x: math.sin(20 * x), -1, 1, 100)
+    assert line['evaluations'] < curve['evaluations']
+
+def test_domain_errors_become_gaps():
+    """Test undefined points are gaps, not failures"""
+    series = sample(math.sqrt, -1, 1, 4)
+    assert series['min'][:2] == [None, None]
+    assert series['max'][:2] == [None, None]
+    assert series['max'][3] == pytest.approx(1)
+
+    series = sample(lambda x: 1 / x, -1, 1, 10)
+    assert None in series['min']
+    assert series['min'][0] is not None
+
+def test_discontinuity_becomes_gap():
+    """Test asymptotes are cut instead of drawn as vertical lines"""
+    series = sample(lambda x: math.tan(math.radians(x)), 0, 180, 60)
+    index = series['x'].index(min(series['x'], key=lambda x: abs(x - 90)))
+    gaps = [i for i, value in enumerate(series['min']) if value is None]
+    assert gaps and all(abs(i - index) <= 1 for i in gaps)
+
+if __name__ == "__main__":
+    pytest.main([__file__])
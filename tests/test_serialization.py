@@ -0,0 +1,96 @@
+"""
+Unit tests for API response serialization
+"""
+import json
+import pytest
+from flask import Flask
+from backend import serialization
+from backend.serialization import (
+    JSON_MIMETYPE, COLUMNAR_MIMETYPE,
+    negotiate, encode, to_columnar, respond
+)
+
+ROWS = [
+    {'id': 2, 'expression': 'sin(30)', 'result': 0.5, 'operation_type': 'scientific'},
+    {'id': 1, 'expression': '2 + 2', 'result': 4.0, 'operation_type': 'arithmetic'},
+]
+
+def test_negotiate():
+    """Test Accept header negotiation"""
+    assert negotiate('') == JSON_MIMETYPE
+    assert negotiate('*/*') == JSON_MIMETYPE
+    assert negotiate('application/json') == JSON_MIMETYPE
+    assert negotiate(COLUMNAR_MIMETYPE) == COLUMNAR_MIMETYPE
+    assert negotiate(f'application/json;q=0.5, {COLUMNAR_MIMETYPE}') == COLUMNAR_MIMETYPE
+    assert negotiate(f'application/json, {COLUMNAR_MIMETYPE};q=0.1') == JSON_MIMETYPE
+    assert negotiate('text/html') == JSON_MIMETYPE
+
+def test_to_columnar():
+    """Test row lists are converted to columns + data"""
+    payload = {'success': True, 'calculations': ROWS, 'count': 2}
+    columnar = to_columnar(payload)
+    assert columnar['success'] is True
+    assert columnar['count'] == 2
+    assert columnar['calculations']['columns'] == ['id', 'expression', 'result', 'operation_type']
+    assert columnar['calculations']['data'][0] == [2, 'sin(30)', 0.5, 'scientific']
+    # Original payload is untouched
+    assert payload['calculations'] is ROWS
+    # Empty lists are left as they are
+    assert to_columnar({'calculations': []}) == {'calculations': []}
+
+def test_encode():
+    """Test encoding round-trips through JSON"""
+    payload = {'success': True, 'calculations': ROWS, 'count': 2}
+    assert json.loads(encode(payload)) == payload
+    assert json.loads(encode(payload, COLUMNAR_MIMETYPE)) == to_columnar(payload)
+    assert json.loads(encode({'result': 1 + 2j})) == {'result': {'re': 1.0, 'im': 2.0}}
+    with pytest.raises(TypeError):
+        encode({'result': object()})
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+
+    @app.route('/history')
+    def history():
+        return respond({'success': True, 'calculations': ROWS})
+
+    @app.route('/error')
+    def error():
+        return respond({'success': False, 'error': 'Bad'}), 400
+
+    return app.test_client()
+
+def test_respond(client):
+    """Test respond() negotiates the mimetype and varies on Accept"""
+    response = client.get('/history')
+    assert response.mimetype == JSON_MIMETYPE
+    assert 'Accept' in response.headers['Vary']
+    assert response.get_json() == {'success': True, 'calculations': ROWS}
+
+    response = client.get('/history', headers={'Accept': COLUMNAR_MIMETYPE})
+    assert response.mimetype == COLUMNAR_MIMETYPE
+    assert json.loads(response.data)['calculations']['data'][1] == [1, '2 + 2', 4.0, 'arithmetic']
+
+    response = client.get('/error')
+    assert response.status_code == 400
+    assert response.get_json() == {'success': False, 'error': 'Bad'}
+
+def test_respond_msgpack(client):
+    """Test msgpack responses are columnar and decode back"""
+    msgpack = pytest.importorskip("msgpack")
+    response = client.get('/history', headers={'Accept': 'application/msgpack'})
+    assert response.mimetype == 'application/msgpack'
+    assert 'Accept' in response.headers['Vary']
+    body = msgpack.unpackb(response.data, raw=False)
+    assert body == to_columnar({'success': True, 'calculations': ROWS})
+
+def test_respond_without_msgpack(client, monkeypatch):
+    """Test msgpack requests fall back to JSON when msgpack is missing"""
+    monkeypatch.setattr(serialization, 'msgpack', None)
+    response = client.get('/history', headers={'Accept': 'application/msgpack'})
+    assert response.mimetype == JSON_MIMETYPE
+    assert response.get_json()['calculations'] == ROWS
+
+if __name__ == "__main__":
+    pytest.main([__file__])